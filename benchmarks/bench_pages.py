@@ -0,0 +1,229 @@
+# Page render benchmarks driven by Streamlit's AppTest.
+#
+# Each scenario opens one page of streamlit_app.py headlessly and then applies the widget
+# changes a visitor typically makes (switching country or year, editing the multiselect,
+# requesting a forecast). Every rerun is timed; a separate pass under tracemalloc records
+# its peak Python memory. Medians are compared with benchmarks/baselines.json and the run
+# fails when a step got slower (or hungrier) than its baseline by more than the threshold.
+# A forecast fitted in the background is waited for, rerunning the page as its polling
+# would, and the fitted forecasts are forgotten before every pass of the prediction
+# scenario, so the step that requests one times the fit.
+#
+# AppTest compiles the whole script again on every rerun, which alone peaks at about
+# 3 MB. The peak of a rerun of the script that only defines its functions is subtracted,
+# so the memory reported is what the page itself allocates.
+#
+#     python benchmarks/bench_pages.py                      # compare with the baselines
+#     python benchmarks/bench_pages.py --update-baselines   # record new baselines
+#     python benchmarks/bench_pages.py --scenario "Flood Analysis" --repeats 10
+#
+# Baselines depend on the machine, so they are not committed: the first run on a machine
+# records them, later runs compare with them and --update-baselines replaces them.
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'streamlit_app.py')
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+
+# Differences below these floors are noise rather than regressions.
+MIN_SECONDS = 0.02
+MIN_BYTES = 256 * 1024
+# Pause between the reruns that wait for a background forecast.
+POLL_SECONDS = 0.05
+
+
+def open_page(name):
+    return lambda at: at.sidebar.selectbox[0].set_value(name)
+
+
+def labelled(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def wait_for_forecasts(at):
+    """Rerun until the page no longer shows a forecast in progress."""
+    while at.get('progress'):
+        time.sleep(POLL_SECONDS)
+        at.run()
+
+
+SCENARIOS = {
+    'Disaster Analytics': [
+        ('open', open_page('Disaster Analytics')),
+        ('country switch', lambda at: at.selectbox(key='chart1').set_value('India')),
+        ('year switch', lambda at: labelled(at.selectbox, 'Select a year').set_value('2010')),
+        ('dataset switch', lambda at: at.radio[0].set_value('Cleaned')),
+    ],
+    'Future Prediction': [
+        ('open', open_page('Future Prediction')),
+        ('arima prediction', lambda at: at.button[0].click()),
+        ('engine switch', lambda at: labelled(at.selectbox, 'Forecasting engine:').set_value('TSB')),
+        ('tsb prediction', lambda at: at.button[0].click()),
+    ],
+}
+for page in ('Drought Analysis', 'Extreme Temperature Analysis', 'Flood Analysis',
+             'Landslide Analysis', 'Storm Analysis', 'Wildfire Analysis'):
+    SCENARIOS[page] = [
+        ('open', open_page(page)),
+        ('multiselect edit', lambda at: at.multiselect[0].select('China, P.R.: Mainland')),
+        ('country switch', lambda at: at.selectbox(key='chart2').set_value('India')),
+    ]
+
+
+def cold_forecasts():
+    """Forget the forecasts fitted so far, so the prediction steps fit their model again."""
+    from disaster_hub import forecast_jobs, forecasting
+    forecasting.forecast_cache.clear()
+    forecast_jobs.forget_finished()
+
+
+# Run before every pass of a scenario.
+RESETS = {'Future Prediction': cold_forecasts}
+
+
+def script_overhead(repeats=3):
+    """Median peak memory of rerunning the app script without rendering any page."""
+    with open(APP) as handle:
+        source = handle.read()
+    entry_point = 'if __name__ == "__main__":\n    main()'
+    if entry_point not in source:
+        raise RuntimeError(f"{APP} has no entry point to leave out")
+    at = AppTest.from_string(source.replace(entry_point, ''), default_timeout=120)
+    at.run()
+    peaks = []
+    for _ in range(repeats):
+        gc.collect()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        at.run()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    return statistics.median(peaks)
+
+
+def run_scenario(steps, trace_memory=False):
+    """Run the steps once and return {step: (seconds, peak bytes or None)}."""
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    results = {}
+    for step, action in steps:
+        action(at)
+        # A collection left over from the previous step would otherwise land in this one.
+        gc.collect()
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        at.run()
+        wait_for_forecasts(at)
+        seconds = time.perf_counter() - started
+        # Relative to what was allocated before the step, so memory retained by earlier
+        # runs (or by Streamlit's own one-off work in the same process) is not counted.
+        peak = tracemalloc.get_traced_memory()[1] - before if trace_memory else None
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].value}")
+        results[step] = (seconds, peak)
+    return results
+
+
+def measure(name, steps, repeats):
+    timings = {step: [] for step, _ in steps}
+    reset = RESETS.get(name, lambda: None)
+    # The first pass fills the process-wide caches; only warm reruns are compared. The app
+    # runs in this process, so its background imports are waited for as well: they would
+    # otherwise compete with the measured reruns.
+    run_scenario(steps)
+    from disaster_hub import startup
+    startup.warm_up().join()
+    for _ in range(repeats):
+        reset()
+        for step, (seconds, _) in run_scenario(steps).items():
+            timings[step].append(seconds)
+    tracemalloc.start()
+    try:
+        overhead = script_overhead()
+        reset()
+        peaks = {step: peak for step, (_, peak) in run_scenario(steps, trace_memory=True).items()}
+    finally:
+        tracemalloc.stop()
+    return {
+        f"{name} / {step}": {'seconds': statistics.median(timings[step]),
+                             'peak_bytes': max(0, peaks[step] - overhead)}
+        for step, _ in steps
+    }
+
+
+def compare(results, baselines, threshold):
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        status = 'new'
+        if baseline is not None:
+            slower = result['seconds'] - baseline['seconds']
+            bigger = result['peak_bytes'] - baseline['peak_bytes']
+            status = 'ok'
+            if slower > max(MIN_SECONDS, baseline['seconds'] * threshold):
+                status = 'SLOWER'
+            elif bigger > max(MIN_BYTES, baseline['peak_bytes'] * threshold):
+                status = 'MORE MEMORY'
+            if status != 'ok':
+                regressions.append(key)
+        reference = f"{baseline['seconds'] * 1000:8.1f}" if baseline else '       -'
+        print(f"{key:55} {result['seconds'] * 1000:8.1f} ms (baseline {reference} ms) "
+              f"{result['peak_bytes'] / 1024:8.0f} KB  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark page reruns of the Streamlit app.')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='only run these scenarios')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed relative slowdown or memory growth before failing (default 0.5)')
+    parser.add_argument('--update-baselines', action='store_true')
+    args = parser.parse_args(argv)
+
+    # AppTest resolves the app's relative imports and data from the repository root.
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results.update(measure(name, SCENARIOS[name], args.repeats))
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as handle:
+            baselines = json.load(handle)
+
+    if args.update_baselines:
+        baselines.update(results)
+        compare(results, {}, args.threshold)
+        regressions = []
+    else:
+        regressions = compare(results, baselines, args.threshold)
+    # Steps without a baseline on this machine yet (all of them on the first run) are
+    # recorded, so the next run compares with them.
+    if args.update_baselines or results.keys() - baselines.keys():
+        baselines = {**results, **baselines}
+        with open(BASELINES, 'w') as handle:
+            json.dump(baselines, handle, indent=2, sort_keys=True)
+        print(f"Baselines written to {BASELINES}")
+
+    if regressions:
+        print(f"{len(regressions)} step(s) regressed past the {args.threshold:.0%} threshold")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# Data-size scaling benchmarks.
+#
+# Generates tables in the layout of Main.csv at several multiples of its size with
+# disaster_hub.synthetic and measures each step of the data path on them: reading the CSV,
+# compacting the frame, building the cube, computing the rollup tables, and the work one
+# page rerun does on the loaded data, both the way the pages used to do it (melting and
+# grouping the wide table) and as cube lookups. Every step is timed (median of the
+# repeats) and a separate pass under tracemalloc records its peak Python memory; the size
+# of the loaded frame, its compact form and the cube are reported as well.
+#
+# The results are written to benchmarks/scaling/results.json and plotted against the number
+# of rows in benchmarks/scaling/scaling.html. Generated tables are kept in data/synthetic/
+# and reused by later runs.
+#
+#     python benchmarks/bench_scaling.py                       # 1x, 10x, 100x and 1000x
+#     python benchmarks/bench_scaling.py --scales 1 10 --repeats 5
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import altair as alt
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(ROOT, 'benchmarks', 'scaling')
+sys.path.insert(0, ROOT)
+
+from disaster_hub import aggregates, compact, loader, regions, synthetic  # noqa: E402
+from disaster_hub.cube import TOTAL, DisasterCube  # noqa: E402
+
+SCALES = (1, 10, 100, 1000)
+# A single indicator and year stand in for the ones a visitor picks.
+INDICATOR = 'Flood'
+YEAR = '2010'
+
+
+def synthetic_table(scale, seed):
+    path = loader.data_path(os.path.join('synthetic', f"Main_x{scale}.csv"))
+    if not os.path.exists(path):
+        synthetic.main(['--scale', str(scale), '--seed', str(seed), '--output', path])
+    return path
+
+
+def legacy_rerun(frame, years):
+    """The aggregations the pages used to run on the wide table on every rerun."""
+    frame[['Country', 'Indicator', YEAR]].groupby('Indicator').sum()
+    frame[frame['Indicator'] == TOTAL].groupby('Country')['Total'].sum()
+    indicator = frame[frame['Indicator'] == INDICATOR]
+    indicator.groupby(['Country']).sum()
+    pd.melt(indicator[['Country'] + years], id_vars=['Country'], var_name='Year').groupby('Year')['value'].sum()
+
+
+def cube_rerun(cube):
+    """The same numbers from the cube."""
+    cube.year_distribution(YEAR)
+    cube.country_totals(TOTAL)
+    cube.country_totals(INDICATOR)
+    cube.year_totals(INDICATOR)
+
+
+def data_path_steps(path):
+    """(step, function) pairs run in order; each gets the previous steps' results."""
+    state = {}
+    iso3 = loader.load_store(columns=['Country', 'ISO3']).drop_duplicates('Country').set_index('Country')['ISO3']
+    table = regions.read_regions(loader.data_path(regions.REGIONS_FILE))
+
+    def read():
+        state['frame'] = pd.read_csv(path)
+        state['years'] = synthetic.year_columns(state['frame'])
+
+    def compact_frame():
+        state['compact'] = compact.compact_frame(state['frame'])
+
+    def build_cube():
+        state['cube'] = DisasterCube.from_frame(state['frame'], state['years'])
+
+    def rollups():
+        frame = state['frame'].assign(ISO3=iso3.reindex(synthetic.parent_country(state['frame']['Country'])).to_numpy())
+        aggregates.compute_aggregates(frame, state['years'], table)
+
+    return state, [
+        ('read csv', read),
+        ('compact', compact_frame),
+        ('build cube', build_cube),
+        ('rollups', rollups),
+        ('legacy rerun', lambda: legacy_rerun(state['frame'], state['years'])),
+        ('cube rerun', lambda: cube_rerun(state['cube'])),
+    ]
+
+
+def run_steps(path, trace_memory=False):
+    state, steps = data_path_steps(path)
+    results = {}
+    for step, function in steps:
+        gc.collect()
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - started
+        results[step] = (seconds, tracemalloc.get_traced_memory()[1] - before if trace_memory else None)
+    return state, results
+
+
+def measure(scale, repeats, seed):
+    path = synthetic_table(scale, seed)
+    timings = {}
+    for _ in range(repeats):
+        state, results = run_steps(path)
+        for step, (seconds, _) in results.items():
+            timings.setdefault(step, []).append(seconds)
+    tracemalloc.start()
+    try:
+        _, results = run_steps(path, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+    rows = len(state['frame'])
+    sizes = {
+        'frame_bytes': compact.memory_bytes(state['frame']),
+        'compact_bytes': compact.memory_bytes(state['compact']),
+        'cube_bytes': int(state['cube'].values.nbytes + state['cube'].present.nbytes),
+    }
+    return [
+        {'scale': scale, 'rows': rows, 'step': step, 'seconds': statistics.median(timings[step]),
+         'peak_bytes': results[step][1], **sizes}
+        for step in timings
+    ]
+
+
+def plot(results, path):
+    frame = pd.DataFrame(results)
+    frame['peak_mb'] = frame['peak_bytes'] / 1024 / 1024
+    base = alt.Chart(frame).mark_line(point=True).encode(
+        x=alt.X('rows:Q', scale=alt.Scale(type='log'), title='Rows'),
+        color=alt.Color('step:N', title='Step'),
+        tooltip=['step', 'scale', 'rows', 'seconds', 'peak_mb'],
+    )
+    seconds = base.encode(y=alt.Y('seconds:Q', scale=alt.Scale(type='log'), title='Seconds')).properties(
+        title='Time per step', width=420, height=320)
+    memory = base.encode(y=alt.Y('peak_mb:Q', scale=alt.Scale(type='log'), title='Peak MB')).properties(
+        title='Peak memory per step', width=420, height=320)
+    alt.hconcat(seconds, memory).save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the data path on synthetic tables of growing size.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        rows = measure(scale, args.repeats, args.seed)
+        results.extend(rows)
+        for row in rows:
+            print(f"x{scale:<5} {row['rows']:9} rows  {row['step']:14} {row['seconds'] * 1000:10.1f} ms "
+                  f"{row['peak_bytes'] / 1024 / 1024:9.1f} MB peak")
+        print(f"x{scale:<5} frame {rows[0]['frame_bytes'] / 1024 / 1024:.1f} MB, compact "
+              f"{rows[0]['compact_bytes'] / 1024 / 1024:.1f} MB, cube {rows[0]['cube_bytes'] / 1024 / 1024:.1f} MB")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'results.json'), 'w') as handle:
+        json.dump(results, handle, indent=2)
+    plot(results, os.path.join(args.output_dir, 'scaling.html'))
+    print(f"Results written to {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
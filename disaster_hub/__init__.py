@@ -0,0 +1 @@
+# Data access, analytics and forecasting helpers shared by the pages in streamlit_app.py.
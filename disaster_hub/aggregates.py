@@ -0,0 +1,152 @@
+# Rollup tables computed once at ingest time and read by the pages as they are.
+#
+# The summaries the pages show only change when the source data changes: the number of
+# occurrences of each indicator per year, each country's total per indicator (the TOTAL
+# rows feed the world map), and each year's share of an indicator's total. They are
+# computed from the cube when the store is built and written next to it, together with a
+# manifest recording the digest of the source file they were computed from. The loader
+# recomputes them when that digest no longer matches the store.
+#
+# The same run rolls every indicator's yearly counts up the country -> subregion -> region
+# -> world hierarchy of disaster_hub.regions, so region-level charts are lookups too. The
+# manifest also records the digest of the regions table, and editing it triggers a rebuild.
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import artifacts
+from disaster_hub import regions as hierarchy
+from disaster_hub.cube import DisasterCube
+
+MANIFEST_FILE = 'manifest.json'
+TABLES = ('country_totals', 'year_totals', 'year_shares', 'group_totals')
+
+
+def compute_aggregates(frame, years, regions):
+    """Compute every rollup table from a store frame (one row per country and indicator)
+    and the regions table."""
+    cube = DisasterCube.from_frame(frame, years)
+    iso3 = frame.drop_duplicates('Country').set_index('Country')['ISO3']
+
+    country_totals = []
+    for indicator in cube.indicators:
+        countries, totals = cube.country_totals(indicator)
+        country_totals.append(pd.DataFrame({
+            'Indicator': indicator,
+            'Country': countries,
+            'ISO3': iso3.loc[countries].to_numpy(),
+            'Total': totals,
+        }))
+
+    year_totals = pd.DataFrame([cube.year_totals(indicator) for indicator in cube.indicators],
+                               index=pd.Index(cube.indicators, name='Indicator'), columns=years)
+    year_shares = pd.DataFrame([cube.year_shares(indicator) for indicator in cube.indicators],
+                               index=pd.Index(cube.indicators, name='Indicator'), columns=years)
+
+    return {
+        'country_totals': pd.concat(country_totals, ignore_index=True),
+        'year_totals': year_totals.reset_index(),
+        'year_shares': year_shares.reset_index(),
+        'group_totals': group_totals(cube, iso3.loc[cube.countries], regions),
+    }
+
+
+def group_totals(cube, iso3, regions):
+    """Yearly counts of every indicator per subregion, per region and for the world."""
+    parts = []
+    for level in hierarchy.LEVELS:
+        groups, codes = np.unique(hierarchy.country_groups(iso3, regions, level), return_inverse=True)
+        totals = np.zeros((len(groups), len(cube.indicators), len(cube.years)), dtype=np.int64)
+        np.add.at(totals, codes, cube.values)
+        parts.append((level, groups, totals))
+    parts.append((hierarchy.WORLD, np.array([hierarchy.WORLD]), cube.values.sum(axis=0, dtype=np.int64)[None]))
+
+    frames = []
+    for level, groups, totals in parts:
+        table = pd.DataFrame(totals.reshape(-1, len(cube.years)), columns=cube.years)
+        table.insert(0, 'Indicator', np.tile(cube.indicators, len(groups)))
+        table.insert(0, 'Group', np.repeat(groups, len(cube.indicators)))
+        table.insert(0, 'Level', level)
+        frames.append(table)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_aggregates(tables, target_dir, version, years, regions_version=None):
+    artifacts.write_with_manifest(
+        target_dir, {f"{name}.parquet": artifacts.parquet_writer(tables[name]) for name in TABLES}, MANIFEST_FILE,
+        {'version': version, 'regions': regions_version, 'years': list(years), 'tables': list(TABLES)})
+
+
+def read_manifest(target_dir):
+    path = os.path.join(target_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def read_aggregates(target_dir):
+    manifest = read_manifest(target_dir)
+    tables = {name: pd.read_parquet(os.path.join(target_dir, f"{name}.parquet")) for name in manifest['tables']}
+    return Rollups(tables, manifest['version'], manifest['years'])
+
+
+class Rollups:
+    """Lookups over the precomputed tables; every query is a dictionary or row lookup."""
+
+    def __init__(self, tables, version, years):
+        self.version = version
+        self.years = list(years)
+        self._country_tables = {
+            indicator: group.drop(columns='Indicator').reset_index(drop=True)
+            for indicator, group in tables['country_totals'].groupby('Indicator', sort=False)
+        }
+        self._country_totals = {
+            indicator: (table['Country'].to_numpy(), table['Total'].to_numpy())
+            for indicator, table in self._country_tables.items()
+        }
+        self._year_totals = tables['year_totals'].set_index('Indicator')
+        self._year_shares = tables['year_shares'].set_index('Indicator')
+        self._groups = {}
+        self._group_series = {}
+        for (level, indicator), table in tables['group_totals'].groupby(['Level', 'Indicator'], sort=False):
+            self._groups[level] = table['Group'].tolist()
+            self._group_series[level, indicator] = dict(zip(table['Group'], table[self.years].to_numpy()))
+
+    def country_totals(self, indicator):
+        """Countries reporting the indicator and their total over all years."""
+        return self._country_totals[indicator]
+
+    def country_totals_table(self, indicator):
+        """Country, ISO3 and Total of the countries reporting the indicator (shared, read-only)."""
+        return self._country_tables[indicator]
+
+    def year_distribution(self, year, indicators):
+        """Occurrences of each of the given indicators across all countries in one year."""
+        return self._year_totals.loc[indicators, str(year)].to_numpy()
+
+    def year_totals(self, indicator):
+        return self._year_totals.loc[indicator, self.years].to_numpy()
+
+    def year_shares(self, indicator):
+        return self._year_shares.loc[indicator, self.years].to_numpy()
+
+    def year_slice(self, first, last):
+        """Positions of the years from first to last (inclusive) in the per-year tables."""
+        return slice(self.years.index(str(first)), self.years.index(str(last)) + 1)
+
+    def groups(self, level):
+        """Names of the groups at a level of the hierarchy (Subregion, Region or World)."""
+        return self._groups[level]
+
+    def group_series(self, level, group, indicator):
+        """Occurrences per year of the indicator across the countries of one group."""
+        return self._group_series[level, indicator][group]
+
+    def group_series_for(self, level, groups, indicator):
+        """Occurrences per year for several groups of one level (groups x years)."""
+        series = self._group_series[level, indicator]
+        return np.array([series[group] for group in groups]).reshape(len(groups), len(self.years))
@@ -0,0 +1,220 @@
+# Read-only JSON query service over the same data and code the Streamlit pages use.
+#
+#     python -m disaster_hub.api [--host 127.0.0.1] [--port 8502]
+#
+# Endpoints (all GET, parameters in the query string):
+#
+#     /meta                                  countries, indicators, years and data version
+#     /series?country=&indicator=            counts per year for one series
+#     /distribution?year=                    occurrences of each disaster type in one year
+#     /totals?indicator=                     total per country (ISO3 included)
+#     /shares?indicator=                     each year's share of the indicator's total
+#     /groups?indicator=[&level=Region]      counts per year of every region, subregion or the world
+#     /forecast?country=&indicator=[&engine=ARIMA|AutoARIMA|SES|Croston|TSB]
+#
+# Every response carries a strong ETag derived from the data version (and, for ARIMA
+# forecasts, the version of the stored forecasts) and the canonical request, so a client
+# that sends it back in If-None-Match gets a bodyless 304 without the answer being
+# computed again. Responses ask caches to revalidate rather than expire them by age.
+
+import argparse
+import hashlib
+import json
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from disaster_hub import batch_forecast, fast_forecast, forecasting, loader, order_search, regions
+
+
+class QueryError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _param(params, name):
+    value = params.get(name)
+    if not value:
+        raise QueryError(HTTPStatus.BAD_REQUEST, f"missing parameter: {name}")
+    return value
+
+
+def _lookup(codes, value, kind):
+    if value not in codes:
+        raise QueryError(HTTPStatus.NOT_FOUND, f"unknown {kind}: {value}")
+    return value
+
+
+def meta(params):
+    cube = loader.load_cube()
+    return {
+        'version': loader.store_version(),
+        'countries': cube.countries.tolist(),
+        'indicators': cube.indicators.tolist(),
+        'years': cube.years,
+    }
+
+
+def series(params):
+    cube = loader.load_cube()
+    country = _lookup(set(cube.countries), _param(params, 'country'), 'country')
+    indicator = _lookup(set(cube.indicators), _param(params, 'indicator'), 'indicator')
+    return {
+        'country': country,
+        'indicator': indicator,
+        'years': cube.years,
+        'values': cube.series(country, indicator).tolist(),
+    }
+
+
+def distribution(params):
+    cube = loader.load_cube()
+    year = _lookup(set(cube.years), _param(params, 'year'), 'year')
+    counts = loader.load_rollups().year_distribution(year, cube.disaster_types)
+    return {'year': year, 'counts': dict(zip(cube.disaster_types, counts.tolist()))}
+
+
+def totals(params):
+    cube = loader.load_cube()
+    indicator = _lookup(set(cube.indicators), _param(params, 'indicator'), 'indicator')
+    table = loader.load_rollups().country_totals_table(indicator)
+    return {'indicator': indicator, 'totals': table.to_dict(orient='records')}
+
+
+def shares(params):
+    cube = loader.load_cube()
+    indicator = _lookup(set(cube.indicators), _param(params, 'indicator'), 'indicator')
+    return {
+        'indicator': indicator,
+        'years': cube.years,
+        'shares': loader.load_rollups().year_shares(indicator).tolist(),
+    }
+
+
+def groups(params):
+    cube = loader.load_cube()
+    indicator = _lookup(set(cube.indicators), _param(params, 'indicator'), 'indicator')
+    level = _lookup({*regions.LEVELS, regions.WORLD}, params.get('level', 'Region'), 'level')
+    rollups = loader.load_rollups()
+    return {
+        'indicator': indicator,
+        'level': level,
+        'years': cube.years,
+        'groups': {group: rollups.group_series(level, group, indicator).tolist() for group in rollups.groups(level)},
+    }
+
+
+def forecast(params):
+    cube = loader.load_cube()
+    country = _lookup(set(cube.countries), _param(params, 'country'), 'country')
+    indicator = _lookup(set(cube.indicators), _param(params, 'indicator'), 'indicator')
+    engine = _lookup({'ARIMA', 'AutoARIMA', *fast_forecast.ENGINES}, params.get('engine', 'ARIMA'), 'engine')
+    extra = {}
+    if engine == 'AutoARIMA':
+        span = forecasting.training_span(cube.years)
+        values = cube.series(country, indicator)[span]
+        order, _ = order_search.order_for(country, indicator, values, cube.years[span])
+        values, _ = forecasting.cached_forecast(values, cube.years[span], order)
+        years = forecasting.forecast_years(cube.years)
+        extra['order'] = list(order)
+    elif engine == 'ARIMA':
+        stored = batch_forecast.load_stored()
+        found = stored.lookup(country, indicator) if stored is not None else None
+        if found is None:
+            raise QueryError(HTTPStatus.NOT_FOUND, f"no stored forecast for {country} - {indicator}")
+        years, values = found
+    else:
+        forecasts = fast_forecast.load_forecast_cube(engine)
+        years = forecasting.forecast_years(cube.years)
+        values = forecasts[cube.country_code(country), cube.indicator_code(indicator)]
+    return {
+        'country': country,
+        'indicator': indicator,
+        'engine': engine,
+        'years': [int(year) for year in years],
+        'values': [float(value) for value in values],
+        **extra,
+    }
+
+
+ROUTES = {
+    '/meta': meta,
+    '/series': series,
+    '/distribution': distribution,
+    '/totals': totals,
+    '/shares': shares,
+    '/groups': groups,
+    '/forecast': forecast,
+}
+
+
+def etag(path, params):
+    """Strong validator for a request: the data version plus the canonical request."""
+    parts = [loader.store_version(), loader.regions_version(), path, json.dumps(sorted(params.items()))]
+    if path == '/forecast' and params.get('engine', 'ARIMA') in ('ARIMA', 'AutoARIMA'):
+        stored = batch_forecast.load_stored() if params.get('engine', 'ARIMA') == 'ARIMA' else order_search.load_orders()
+        parts.append(json.dumps(stored.manifest, sort_keys=True) if stored is not None else '')
+    return '"' + hashlib.sha256('\0'.join(parts).encode()).hexdigest()[:32] + '"'
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    server_version = 'DisasterHubAPI/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        handler = ROUTES.get(url.path)
+        if handler is None:
+            return self._send_json(HTTPStatus.NOT_FOUND, {'error': f"unknown endpoint: {url.path}"})
+        params = dict(parse_qsl(url.query))
+
+        tag = etag(url.path, params)
+        requested = [value.strip() for value in self.headers.get('If-None-Match', '').split(',')]
+        if tag in requested or '*' in requested:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_cache_headers(tag)
+            self.end_headers()
+            return
+
+        try:
+            body = handler(params)
+        except QueryError as error:
+            return self._send_json(error.status, {'error': str(error)})
+        self._send_json(HTTPStatus.OK, body, tag)
+
+    def _send_cache_headers(self, tag):
+        self.send_header('ETag', tag)
+        self.send_header('Cache-Control', 'no-cache')
+
+    def _send_json(self, status, body, tag=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if tag is not None:
+            self._send_cache_headers(tag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def serve(host='127.0.0.1', port=8502):
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Serving disaster data on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the disaster aggregates as JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# Atomic writes of the files published under data/.
+#
+# Other sessions and processes may open these files at any moment, so each one is written
+# to a temporary file next to it and moved into place with os.replace. A directory of
+# tables (the aggregates, the cube, stored forecasts, orders and backtests) comes with a
+# JSON manifest naming the data version it was built from; the manifest is written last,
+# so a reader that sees the new version also sees every new table.
+
+import json
+import os
+
+
+def replace_atomic(path, write):
+    """Call write(tmp_path), then move the temporary file onto path."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def parquet_writer(frame):
+    return lambda path: frame.to_parquet(path, index=False)
+
+
+def write_json(path, document):
+    with open(path, 'w') as handle:
+        json.dump(document, handle, indent=2)
+
+
+def write_with_manifest(target_dir, writers, manifest_file, manifest):
+    """Write each {file name: write(path)} into target_dir, then the manifest."""
+    os.makedirs(target_dir, exist_ok=True)
+    for name, write in writers.items():
+        replace_atomic(os.path.join(target_dir, name), write)
+    replace_atomic(os.path.join(target_dir, manifest_file), lambda path: write_json(path, manifest))
@@ -0,0 +1,219 @@
+# Rolling-origin backtest of the forecasting engines over every (Country, Indicator) series.
+#
+# For each origin year the models are trained on the years up to and including it and
+# forecast the next `steps` years, which are then scored against what was reported: with
+# the default origins 2012-2016 the last fit trains on every year up to 2016 and scores
+# 2017-2021.
+# Errors are reported per model and horizon (1 = the year after the origin), together with
+# the time spent fitting, so engines and ARIMA orders can be compared on accuracy and
+# throughput alike.
+#
+# ARIMA models are fitted one series at a time, spread over a process pool; the vectorized
+# engines of disaster_hub.fast_forecast forecast all series of an origin at once. "Naive"
+# repeats the last observed year and is the baseline every model should beat.
+#
+# Each run is saved under data/backtests/<name>/ (the per-horizon scores, every forecast
+# with its actual value, and a manifest), so runs with other engines or orders can be
+# compared later with --list.
+#
+#     python -m disaster_hub.backtest [--name NAME] [--models ARIMA SES ...] [--order 1,1,1]
+#                                     [--origins 2012 2016] [--steps 5] [--workers N]
+#     python -m disaster_hub.backtest --list
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import artifacts, fast_forecast, forecasting, loader, order_search
+
+BACKTESTS_DIR = 'backtests'
+MANIFEST_FILE = 'manifest.json'
+ARIMA_MODELS = ('ARIMA', 'Auto ARIMA')
+MODELS = ARIMA_MODELS + tuple(fast_forecast.ENGINES) + ('Naive',)
+# Auto ARIMA searches the order again at every origin, which takes several times longer
+# than the other models together, so it only runs when asked for.
+DEFAULT_MODELS = ('ARIMA',) + tuple(fast_forecast.ENGINES) + ('Naive',)
+
+
+def naive(values, steps):
+    values = np.asarray(values, dtype=np.float64)
+    return np.repeat(values[:, -1:], steps, axis=1)
+
+
+def _arima_task(task):
+    """Forecasts (origins x steps) and fit seconds of one series at every origin."""
+    values, years, cutoffs, model, order, steps = task
+    forecasts = np.zeros((len(cutoffs), steps))
+    seconds = 0.0
+    for row, cutoff in enumerate(cutoffs):
+        train, train_years = values[:cutoff], years[:cutoff]
+        started = time.perf_counter()
+        if model == 'Auto ARIMA':
+            order = order_search.select_order(train, train_years)[0]
+        forecasts[row], _ = forecasting.fit_and_forecast_arima(train, train_years, order, steps)
+        seconds += time.perf_counter() - started
+    return forecasts, seconds
+
+
+def run_model(model, values, years, cutoffs, steps, pool=None, order=forecasting.ORDER):
+    """Forecasts (series x origins x steps) of one model and the time it took."""
+    started = time.perf_counter()
+    if model in ARIMA_MODELS:
+        tasks = [(series.tolist(), years, cutoffs, model, order, steps) for series in values]
+        results = list(pool.map(_arima_task, tasks, chunksize=16))
+        forecasts = np.stack([forecast for forecast, _ in results])
+        fit_seconds = sum(seconds for _, seconds in results)
+    else:
+        engine = naive if model == 'Naive' else fast_forecast.ENGINES[model]
+        forecasts = np.stack([engine(values[:, :cutoff], steps) for cutoff in cutoffs], axis=1)
+        fit_seconds = None
+    elapsed = time.perf_counter() - started
+    return forecasts, elapsed, elapsed if fit_seconds is None else fit_seconds
+
+
+def score(model, forecasts, actuals, origins):
+    """MAE, RMSE and bias per origin and horizon, and over all origins per horizon."""
+    errors = forecasts - actuals
+    rows = []
+    for horizon in range(errors.shape[2]):
+        for position, origin in enumerate(origins + ['all']):
+            error = errors[:, :, horizon] if origin == 'all' else errors[:, position, horizon]
+            error = error[~np.isnan(error)]
+            if len(error):
+                rows.append({
+                    'Model': model, 'Origin': str(origin), 'Horizon': horizon + 1, 'Forecasts': len(error),
+                    'MAE': float(np.abs(error).mean()), 'RMSE': float(np.sqrt((error ** 2).mean())),
+                    'Bias': float(error.mean()),
+                })
+    return rows
+
+
+def run(name='latest', models=DEFAULT_MODELS, origins=None, steps=forecasting.HORIZON, order=forecasting.ORDER,
+        workers=None, target_dir=None):
+    target_dir = target_dir or loader.data_path(os.path.join(BACKTESTS_DIR, name))
+    cube = loader.load_cube()
+    span = forecasting.training_span(cube.years)
+    years = cube.years[span]
+    country_codes, indicator_codes, values = cube.present_series()
+    values = np.asarray(values[:, span], dtype=np.float64)
+    origins = [str(origin) for origin in (origins or range(int(years[-1]) - steps - 4, int(years[-1]) - steps + 1))]
+    cutoffs = [years.index(origin) + 1 for origin in origins]
+
+    # Actual values of every (series, origin, horizon); NaN past the last year.
+    actuals = np.full((len(values), len(origins), steps), np.nan)
+    for position, cutoff in enumerate(cutoffs):
+        observed = values[:, cutoff:cutoff + steps]
+        actuals[:, position, :observed.shape[1]] = observed
+
+    scores, timings, forecasts = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for model in models:
+            predicted, elapsed, fit_seconds = run_model(model, values, years, cutoffs, steps, pool, order)
+            scores.extend(score(model, predicted, actuals, origins))
+            fits = len(values) * len(origins)
+            timings.append({'Model': model, 'Fits': fits, 'Seconds': elapsed, 'Fit seconds': fit_seconds,
+                            'Fits per second': fits / elapsed if elapsed else float('inf')})
+            forecasts.append(pd.DataFrame({
+                'Model': model,
+                'Country': np.repeat(cube.countries[country_codes], len(origins) * steps),
+                'Indicator': np.repeat(cube.indicators[indicator_codes], len(origins) * steps),
+                'Origin': np.tile(np.repeat(origins, steps), len(values)),
+                'Horizon': np.tile(np.arange(1, steps + 1), len(values) * len(origins)),
+                'Forecast': predicted.ravel(),
+                'Actual': actuals.ravel(),
+            }))
+
+    manifest = {
+        'name': name,
+        'version': loader.store_version(),
+        'train_from': forecasting.TRAIN_FROM,
+        'models': list(models),
+        'order': list(order),
+        'origins': origins,
+        'steps': steps,
+        'series': len(values),
+        'workers': workers or os.cpu_count(),
+        'timings': timings,
+    }
+    write_backtest(target_dir, pd.DataFrame(scores), pd.concat(forecasts, ignore_index=True), manifest)
+    return manifest
+
+
+def write_backtest(target_dir, scores, forecasts, manifest):
+    artifacts.write_with_manifest(target_dir, {
+        'scores.parquet': artifacts.parquet_writer(scores),
+        'forecasts.parquet': artifacts.parquet_writer(forecasts),
+    }, MANIFEST_FILE, manifest)
+
+
+def read_backtest(target_dir):
+    """Manifest and per-horizon scores of a saved run."""
+    with open(os.path.join(target_dir, MANIFEST_FILE)) as handle:
+        manifest = json.load(handle)
+    return manifest, pd.read_parquet(os.path.join(target_dir, 'scores.parquet'))
+
+
+def load_backtests(base_dir=None):
+    """Every saved run for the current data, as {name: (manifest, scores)}."""
+    base_dir = base_dir or loader.data_path(BACKTESTS_DIR)
+    if not os.path.isdir(base_dir):
+        return {}
+    runs = {}
+    for name in sorted(os.listdir(base_dir)):
+        target_dir = os.path.join(base_dir, name)
+        manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            manifest, scores = loader.get_or_build(('backtest', target_dir), [manifest_path],
+                                                   lambda: read_backtest(target_dir))
+            if manifest['version'] == loader.store_version() and manifest.get('train_from') == forecasting.TRAIN_FROM:
+                runs[name] = (manifest, scores)
+    return runs
+
+
+def summary(runs):
+    """One row per run and model: error over all origins and horizons, and throughput."""
+    rows = []
+    for name, (manifest, scores) in runs.items():
+        overall = scores[scores['Origin'] == 'all']
+        timings = {timing['Model']: timing for timing in manifest['timings']}
+        for model, group in overall.groupby('Model', sort=False):
+            weights = group['Forecasts']
+            rows.append({
+                'Run': name,
+                'Model': f"ARIMA{tuple(manifest['order'])}" if model == 'ARIMA' else model,
+                'MAE': float((group['MAE'] * weights).sum() / weights.sum()),
+                'RMSE': float(np.sqrt((group['RMSE'] ** 2 * weights).sum() / weights.sum())),
+                'Fits per second': timings[model]['Fits per second'],
+            })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of the forecasting engines.')
+    parser.add_argument('--name', default='latest', help='name the run is saved under (default: latest)')
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(DEFAULT_MODELS))
+    parser.add_argument('--order', default=','.join(map(str, forecasting.ORDER)), help='ARIMA order p,d,q')
+    parser.add_argument('--origins', nargs=2, type=int, metavar=('FIRST', 'LAST'),
+                        help='first and last training end year (default: the last five that leave --steps years)')
+    parser.add_argument('--steps', type=int, default=forecasting.HORIZON)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--list', action='store_true', help='compare the saved runs instead of running one')
+    args = parser.parse_args(argv)
+
+    if not args.list:
+        origins = range(args.origins[0], args.origins[1] + 1) if args.origins else None
+        manifest = run(args.name, args.models, origins, args.steps, tuple(int(part) for part in args.order.split(',')),
+                       args.workers)
+        for timing in manifest['timings']:
+            print(f"{timing['Model']:12} {timing['Fits']:6} fits in {timing['Seconds']:7.1f}s "
+                  f"({timing['Fits per second']:.0f} per second)")
+    print(summary(load_backtests()).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Batch job that fits and forecasts every (Country, Indicator) series of the cleaned table
+# ahead of time, spread over a process pool, and stores the results under data/forecasts/.
+#
+# The Future Prediction page serves these stored forecasts directly and only fits a model
+# live when a series has no stored forecast or the stored set is stale (built from another
+# version of the data or with another order or horizon).
+#
+# The same run scores ARIMA on a holdout of the last `steps` years of every series, the
+# way disaster_hub.fast_forecast scores the vectorized engines, so the page can report
+# the accuracy and throughput of all engines side by side.
+#
+#     python -m disaster_hub.batch_forecast [--workers N] [--no-evaluation]
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import artifacts, fast_forecast, forecasting, loader
+
+FORECASTS_DIR = 'forecasts'
+MANIFEST_FILE = 'manifest.json'
+
+
+def _fit_task(task):
+    country, indicator, values, years, order, steps = task
+    forecast, diagnostics = forecasting.cached_forecast(values, years, order, steps)
+    return country, indicator, forecast, diagnostics
+
+
+def run(workers=None, order=forecasting.ORDER, steps=forecasting.HORIZON, target_dir=None, evaluation=True):
+    target_dir = target_dir or loader.data_path(FORECASTS_DIR)
+    cube = loader.load_cube()
+    span = forecasting.training_span(cube.years)
+    years = cube.years[span]
+    country_codes, indicator_codes, values = cube.present_series()
+    values = values[:, span]
+    countries = cube.countries[country_codes]
+    indicators = cube.indicators[indicator_codes]
+    tasks = [
+        (country, indicator, series.tolist(), years, order, steps)
+        for country, indicator, series in zip(countries, indicators, values)
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(_fit_task, tasks, chunksize=16))
+        elapsed = time.perf_counter() - started
+        report = evaluate_arima(pool, tasks, values, steps) if evaluation else None
+
+    future_years = forecasting.forecast_years(years, steps)
+    forecasts = pd.DataFrame({
+        'Country': np.repeat([row[0] for row in results], steps),
+        'Indicator': np.repeat([row[1] for row in results], steps),
+        'Year': np.tile(future_years, len(results)),
+        'Forecast': np.concatenate([row[2] for row in results]),
+    })
+    diagnostics = pd.DataFrame([{'Country': row[0], 'Indicator': row[1], **row[3]} for row in results])
+    manifest = {
+        'version': loader.store_version(),
+        'train_from': forecasting.TRAIN_FROM,
+        'order': list(order),
+        'steps': steps,
+        'series': len(results),
+        'elapsed_seconds': elapsed,
+        'evaluation': report,
+    }
+    write_forecasts(target_dir, forecasts, diagnostics, manifest)
+    return manifest
+
+
+def evaluate_arima(pool, tasks, values, holdout):
+    """Score ARIMA on the last `holdout` years of every series, like fast_forecast.evaluate()."""
+    holdout_tasks = [
+        (country, indicator, series[:-holdout], years[:-holdout], order, holdout)
+        for country, indicator, series, years, order, _ in tasks
+    ]
+    started = time.perf_counter()
+    forecasts = np.array([row[2] for row in pool.map(_fit_task, holdout_tasks, chunksize=16)])
+    seconds = time.perf_counter() - started
+    return {
+        'engine': 'ARIMA',
+        'series': len(tasks),
+        'seconds': seconds,
+        'series_per_second': len(tasks) / seconds,
+        **fast_forecast.holdout_errors(forecasts, np.asarray(values, dtype=np.float64)[:, -holdout:]),
+    }
+
+
+def write_forecasts(target_dir, forecasts, diagnostics, manifest):
+    artifacts.write_with_manifest(target_dir, {
+        'forecasts.parquet': artifacts.parquet_writer(forecasts),
+        'diagnostics.parquet': artifacts.parquet_writer(diagnostics),
+    }, MANIFEST_FILE, manifest)
+
+
+def read_forecasts(target_dir):
+    with open(os.path.join(target_dir, MANIFEST_FILE)) as handle:
+        manifest = json.load(handle)
+    forecasts = pd.read_parquet(os.path.join(target_dir, 'forecasts.parquet'))
+    return StoredForecasts(forecasts, manifest)
+
+
+def load_stored(target_dir=None):
+    """Stored forecasts for the current data, or None when there are none or they are stale."""
+    target_dir = target_dir or loader.data_path(FORECASTS_DIR)
+    manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    stored = loader.get_or_build(('forecasts', target_dir), [manifest_path], lambda: read_forecasts(target_dir))
+    return stored if stored.is_current(loader.store_version()) else None
+
+
+class StoredForecasts:
+
+    def __init__(self, forecasts, manifest):
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.order = tuple(manifest['order'])
+        self.steps = manifest['steps']
+        self.train_from = manifest.get('train_from')
+        self._forecasts = {
+            key: (group['Year'].to_numpy(), group['Forecast'].to_numpy())
+            for key, group in forecasts.groupby(['Country', 'Indicator'], sort=False)
+        }
+
+    def is_current(self, version, order=forecasting.ORDER, steps=forecasting.HORIZON):
+        return (self.version == version and self.order == tuple(order) and self.steps == steps
+                and self.train_from == forecasting.TRAIN_FROM)
+
+    def lookup(self, country, indicator):
+        """Forecast years and values for one series, or None when it was not precomputed."""
+        return self._forecasts.get((country, indicator))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute ARIMA forecasts for every series.')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--no-evaluation', action='store_true', help='skip the holdout evaluation of ARIMA')
+    args = parser.parse_args(argv)
+    manifest = run(workers=args.workers, evaluation=not args.no_evaluation)
+    print(f"Forecast {manifest['series']} series in {manifest['elapsed_seconds']:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Cache of finished Vega-Lite chart specs.
+#
+# Building an Altair chart means assembling its data frame, constructing the chart and
+# validating and converting it to a Vega-Lite spec with the data inlined, and the pages did
+# that on every widget change. The charts a page can show form a small, finite set: one per
+# chart type and selection (a country, a year, a set of countries). spec() keeps the
+# finished spec for each of them, keyed by the chart, its selection and the data version,
+# and the pages render it with st.vega_lite_chart, skipping the build altogether on a hit.
+#
+# The cache is shared by every session of the process and evicts the least recently used
+# specs once their serialized size exceeds max_bytes (DISASTER_HUB_CHART_CACHE_BYTES).
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from disaster_hub import loader
+
+
+class ChartSpecCache:
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._specs = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._specs.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._specs.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, spec):
+        size = len(json.dumps(spec))
+        with self._lock:
+            if key in self._specs:
+                return
+            self._specs[key] = (spec, size)
+            self._bytes += size
+            while self._specs and self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._specs.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._specs),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._specs.clear()
+            self._bytes = 0
+
+
+chart_cache = ChartSpecCache(max_bytes=int(os.environ.get('DISASTER_HUB_CHART_CACHE_BYTES', 32 * 1024 * 1024)))
+
+
+def spec(key, build):
+    """Vega-Lite spec of the chart identified by key; build() returns the Altair chart on a miss.
+
+    The returned dict is shared between sessions and must not be modified.
+    """
+    key = (loader.store_version(),) + tuple(key)
+    cached = chart_cache.get(key)
+    if cached is None:
+        cached = build().to_dict()
+        chart_cache.put(key, cached)
+    return cached
+
+
+_warmed = set()
+_warm_lock = threading.Lock()
+
+
+def prewarm(name, builders):
+    """Build the given (key, build) pairs on a background thread, once per name and data version."""
+    warmed = (name, loader.store_version())
+    with _warm_lock:
+        if warmed in _warmed:
+            return None
+        _warmed.add(warmed)
+    thread = threading.Thread(target=lambda: [spec(key, build) for key, build in builders],
+                              name=f'chart-prewarm-{name}', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,187 @@
+# Incremental rebuild of the cleaned tables (data/Main.csv and the per-disaster files such as
+# data/Flood.csv) from the raw IMF export in data/Original.csv.
+#
+# A cleaned row is the raw row with the short indicator name, the yearly counts from
+# FIRST_YEAR up to the latest year in the export (renamed from F2001... to 2001..., missing
+# years written as 0) and their Total. The per-disaster files hold the rows of one
+# indicator; the TOTAL pseudo-indicator rows only appear in Main.csv.
+#
+# Each raw line is fingerprinted together with the header, and the fingerprints of the last
+# run are kept with its cleaned rows in data/cleaned_state.parquet. A run only parses the
+# lines whose fingerprint it has not seen before (new or revised rows), drops the rows that
+# disappeared and reuses everything else. A new year column changes the header and so every
+# fingerprint, which reprocesses all rows. Only the files whose rows changed, or that were
+# modified or removed since the last run, are written again, each one atomically, and the
+# state is written last. The summary tells the parsed rows apart by their (Country,
+# Indicator) key: added rows are new keys, revised rows replace a row of the last run with
+# the same key, and removed rows are keys of the last run that left the source.
+#
+#     python -m disaster_hub.cleaned [--full]
+#
+# The export has one record per line, which is what makes line fingerprints possible.
+
+import argparse
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from disaster_hub import artifacts, ingest
+
+MAIN_FILE = 'Main.csv'
+STATE_FILE = 'cleaned_state.parquet'
+FIRST_YEAR = 2001
+TOTAL = 'TOTAL'
+
+
+def disaster_file(indicator):
+    return f"{indicator.replace(' ', '_')}.csv"
+
+
+def read_lines(path):
+    """Header and data lines of a CSV file, as bytes without the byte order mark."""
+    with open(path, 'rb') as handle:
+        data = handle.read()
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    lines = data.splitlines()
+    return lines[0], [line for line in lines[1:] if line]
+
+
+def cleaned_years(header):
+    columns = next(csv.reader([header.decode('utf-8')]))
+    return [column[1:] for column in columns
+            if column.startswith('F') and column[1:].isdigit() and int(column[1:]) >= FIRST_YEAR]
+
+
+def fingerprints(header, lines):
+    key = hashlib.sha256(header).digest()
+    return [hashlib.blake2b(line, digest_size=16, key=key).hexdigest() for line in lines]
+
+
+def clean_rows(raw, years):
+    """Cleaned rows (ObjectId, Country, Indicator, years..., Total) of parsed raw rows."""
+    frame = raw[['ObjectId', 'Country']].copy()
+    frame['Indicator'] = ingest.short_indicator(raw['Indicator'])
+    counts = raw[[f"F{year}" for year in years]].fillna(0).astype('float64')
+    counts.columns = years
+    frame = pd.concat([frame, counts], axis=1)
+    frame['Total'] = counts.sum(axis=1)
+    return frame
+
+
+def read_state(path):
+    if not os.path.exists(path):
+        return None, {}
+    table = pq.read_table(path)
+    return table.to_pandas(), json.loads(table.schema.metadata[b'cleaned_state'])
+
+
+def write_csv_atomic(frame, target):
+    artifacts.replace_atomic(target, lambda path: frame.to_csv(path, index=False))
+
+
+def _signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _keys(frame):
+    return set(zip(frame['Country'], frame['Indicator']))
+
+
+def _digest(values):
+    return hashlib.sha256('\n'.join(values).encode()).hexdigest()
+
+
+def update(source, target_dir, full=False):
+    """Bring the cleaned tables in target_dir up to date with source; returns a summary."""
+    started = time.perf_counter()
+    header, lines = read_lines(source)
+    years = cleaned_years(header)
+    prints = fingerprints(header, lines)
+    state_path = os.path.join(target_dir, STATE_FILE)
+    previous, meta = (None, {}) if full else read_state(state_path)
+
+    known = {}
+    if previous is not None:
+        known = dict(zip(previous['Fingerprint'], range(len(previous))))
+    new_positions = [position for position, fingerprint in enumerate(prints) if fingerprint not in known]
+
+    parts = []
+    if new_positions:
+        raw = ingest.read_source(io.BytesIO(b'\n'.join([header] + [lines[position] for position in new_positions])))
+        if len(raw) != len(new_positions):
+            raise ValueError(f"{source} does not have one record per line")
+        fresh = clean_rows(raw, years)
+        fresh.insert(0, 'Fingerprint', [prints[position] for position in new_positions])
+        parts.append(fresh)
+    reused = [known[fingerprint] for fingerprint in prints if fingerprint in known]
+    if reused:
+        parts.append(previous.iloc[reused])
+    # Rows keep the order of the source file.
+    rows = pd.concat(parts, ignore_index=True).set_index('Fingerprint').loc[prints].reset_index()
+
+    outputs = {MAIN_FILE: rows}
+    for indicator in rows['Indicator'].unique():
+        if indicator != TOTAL:
+            outputs[disaster_file(indicator)] = rows[rows['Indicator'] == indicator]
+
+    written = []
+    files = {}
+    for name, frame in outputs.items():
+        path = os.path.join(target_dir, name)
+        digest = _digest(frame['Fingerprint'])
+        last = meta.get('files', {}).get(name)
+        if last is None or last['digest'] != digest or last['signature'] != _signature(path):
+            write_csv_atomic(frame.drop(columns='Fingerprint'), path)
+            written.append(name)
+        files[name] = {'digest': digest, 'signature': _signature(path)}
+
+    if written or new_positions or previous is None or len(previous) != len(rows):
+        table = pa.Table.from_pandas(rows, preserve_index=False)
+        ingest.write_atomic(table, state_path, {b'cleaned_state': json.dumps({'years': years, 'files': files}).encode()})
+
+    previous_keys = set() if previous is None else _keys(previous)
+    revised = len(_keys(parts[0]) & previous_keys) if new_positions else 0
+    return {
+        'rows': len(rows),
+        'parsed': len(new_positions),
+        'reused': len(reused),
+        'added': len(new_positions) - revised,
+        'revised': revised,
+        'removed': len(previous_keys - _keys(rows)),
+        'written': written,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def report(summary):
+    print(f"Cleaned tables: {summary['rows']} rows, {summary['parsed']} parsed ({summary['added']} added, "
+          f"{summary['revised']} revised), {summary['reused']} reused, {summary['removed']} removed, "
+          f"{len(summary['written'])} files written ({', '.join(summary['written']) or 'none'}) "
+          f"in {summary['seconds'] * 1000:.0f} ms")
+
+
+def main(argv=None):
+    from disaster_hub import loader
+
+    parser = argparse.ArgumentParser(description='Rebuild Main.csv and the per-disaster CSV files from Original.csv.')
+    parser.add_argument('--source', default=loader.data_path(ingest.SOURCE_FILE))
+    parser.add_argument('--target-dir', default=loader.DATA_DIR)
+    parser.add_argument('--full', action='store_true', help='ignore the fingerprints of the last run')
+    args = parser.parse_args(argv)
+    report(update(args.source, args.target_dir, full=args.full))
+
+
+if __name__ == '__main__':
+    main()
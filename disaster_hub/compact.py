@@ -0,0 +1,64 @@
+# Compact in-memory representation of the loaded frames.
+#
+# Every process (and every replica) keeps the loaded datasets for its whole lifetime, so
+# their size multiplies. Most of it is avoidable: Country, Indicator and the long Source and
+# CTS_Full_Descriptor texts repeat the same few values on every row, and the yearly counts
+# are small whole numbers read as float64. compact_frame() stores repeated strings as
+# categoricals and whole non-negative numbers in the narrowest unsigned integer type that
+# holds them (a nullable one where values are missing). plain_frame() converts a slice back
+# to ordinary strings and numbers right before it is rendered, so what the browser shows
+# does not change.
+
+import numpy as np
+import pandas as pd
+
+# A string column becomes categorical when it has at most this many distinct values per row.
+CATEGORY_RATIO = 0.5
+UNSIGNED = ('uint8', 'uint16', 'uint32', 'uint64')
+
+
+def memory_bytes(frame):
+    return int(frame.memory_usage(deep=True, index=True).sum())
+
+
+def _unsigned(series):
+    values = series.dropna()
+    if len(values) and (values.min() < 0 or not np.array_equal(values, np.floor(values))):
+        return None
+    top = values.max() if len(values) else 0
+    name = next(name for name in UNSIGNED if top <= np.iinfo(name).max)
+    return name if len(values) == len(series) else name.capitalize().replace('Uint', 'UInt')
+
+
+def compact_column(series):
+    if pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+        if series.nunique(dropna=True) <= max(1, len(series) * CATEGORY_RATIO):
+            return series.astype('category')
+        return series
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        dtype = _unsigned(series)
+        if dtype is not None and dtype != str(series.dtype):
+            return series.astype(dtype)
+    return series
+
+
+def compact_frame(frame):
+    """A copy of frame with categorical strings and narrow unsigned counts."""
+    return pd.DataFrame({column: compact_column(frame[column]) for column in frame.columns}, index=frame.index)
+
+
+def plain_column(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(series.dtype):
+        return series.astype('float64')
+    if pd.api.types.is_unsigned_integer_dtype(series.dtype):
+        return series.astype('int64')
+    return series
+
+
+def plain_frame(frame):
+    """Ordinary strings and numbers again, for rendering a (small) slice of a compact frame."""
+    return pd.DataFrame({column: plain_column(frame[column]) for column in frame.columns}, index=frame.index)
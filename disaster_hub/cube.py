@@ -0,0 +1,178 @@
+# Dense country x indicator x year array that the pages query instead of melting and
+# grouping the wide tables on every rerun.
+#
+# Countries and indicators are integer-coded along the first two axes, so a country's
+# series is a slice, and per-year distributions, per-country totals and year shares are
+# single reductions over the array. Cells for (country, indicator) pairs that have no row
+# in the source are 0 and are flagged as absent in `present`, so pages that list the
+# countries of one indicator still only offer the countries the source reports.
+#
+# Totals over a range of years come from prefix sums along the year axis, kept next to the
+# counts: `prefix[c, i, k]` is the sum of the first k years, so the total of any range is
+# the difference of two cells whatever its width, and `indicator_prefix` does the same for
+# the sum over all countries, so a range total of one indicator costs the same whatever
+# the number of countries.
+#
+# write_cube() publishes a cube as plain .npy arrays next to a JSON file with the country,
+# indicator and year dictionaries. open_cube() memory-maps those arrays read-only instead
+# of loading them, so every process on the host (Streamlit replicas, forecast workers)
+# shares the same pages of the operating system's file cache, and a new process attaches
+# to the cube without reading the store at all.
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import artifacts
+
+TOTAL = 'TOTAL'
+MANIFEST_FILE = 'cube.json'
+ARRAYS = ('values', 'present', 'prefix', 'indicator_prefix')
+
+
+class DisasterCube:
+
+    def __init__(self, countries, indicators, years, values, present, prefix=None, indicator_prefix=None):
+        self.countries = np.asarray(countries, dtype=object)
+        self.indicators = np.asarray(indicators, dtype=object)
+        self.years = list(years)
+        self.values = values
+        self.present = present
+        if prefix is None:
+            prefix = np.zeros(values.shape[:2] + (values.shape[2] + 1,), dtype=np.int64)
+            np.cumsum(values, axis=2, out=prefix[:, :, 1:])
+        self.prefix = prefix
+        self.indicator_prefix = prefix.sum(axis=0) if indicator_prefix is None else indicator_prefix
+        self._country_codes = {country: code for code, country in enumerate(self.countries)}
+        self._indicator_codes = {indicator: code for code, indicator in enumerate(self.indicators)}
+        self._year_codes = {year: code for code, year in enumerate(self.years)}
+        # Everything except the TOTAL pseudo-indicator, in source order.
+        self.disaster_types = [indicator for indicator in self.indicators if indicator != TOTAL]
+        self._disaster_codes = np.array([self._indicator_codes[name] for name in self.disaster_types])
+
+    @classmethod
+    def from_frame(cls, frame, years):
+        """Build the cube from a long table with Country, Indicator and one column per year."""
+        countries, country_codes = _codes(frame['Country'])
+        indicators, indicator_codes = _codes(frame['Indicator'])
+        values = np.zeros((len(countries), len(indicators), len(years)), dtype=np.int32)
+        values[country_codes, indicator_codes] = frame[years].to_numpy(dtype=np.int32)
+        present = np.zeros((len(countries), len(indicators)), dtype=bool)
+        present[country_codes, indicator_codes] = True
+        return cls(countries, indicators, years, values, present)
+
+    def country_code(self, country):
+        return self._country_codes[country]
+
+    def indicator_code(self, indicator):
+        return self._indicator_codes[indicator]
+
+    def year_code(self, year):
+        return self._year_codes[str(year)]
+
+    def year_slice(self, first, last):
+        """Positions of the years from first to last (inclusive) along the year axis."""
+        return slice(self.year_code(first), self.year_code(last) + 1)
+
+    def range_total(self, indicator, first, last, country=None):
+        """Occurrences from first to last, across all countries or for one; two lookups."""
+        span = self.year_slice(first, last)
+        prefix = self.indicator_prefix[self.indicator_code(indicator)] if country is None \
+            else self.prefix[self.country_code(country), self.indicator_code(indicator)]
+        return int(prefix[span.stop] - prefix[span.start])
+
+    def range_totals(self, indicator, first, last):
+        """Occurrences from first to last per country, for the countries reporting the indicator."""
+        span = self.year_slice(first, last)
+        code = self.indicator_code(indicator)
+        mask = self.present[:, code]
+        prefix = self.prefix[mask, code]
+        return self.countries[mask], prefix[:, span.stop] - prefix[:, span.start]
+
+    def countries_for(self, indicator=None):
+        """Countries that have a row for the indicator (all countries when None)."""
+        if indicator is None:
+            return self.countries
+        return self.countries[self.present[:, self.indicator_code(indicator)]]
+
+    def series(self, country, indicator):
+        """Counts per year for one country and indicator."""
+        return self.values[self.country_code(country), self.indicator_code(indicator)]
+
+    def series_for(self, countries, indicator):
+        """Counts per year for several countries and one indicator (countries x years)."""
+        codes = [self.country_code(country) for country in countries]
+        return self.values[codes, self.indicator_code(indicator)]
+
+    def present_series(self):
+        """Codes of every (country, indicator) pair with a row in the source, and their counts."""
+        country_codes, indicator_codes = np.nonzero(self.present)
+        return country_codes, indicator_codes, self.values[country_codes, indicator_codes]
+
+    def country_breakdown(self, country):
+        """Disaster types reported for one country and their counts per year (types x years)."""
+        code = self.country_code(country)
+        reported = self._disaster_codes[self.present[code, self._disaster_codes]]
+        return list(self.indicators[reported]), self.values[code, reported]
+
+    def country_totals(self, indicator):
+        """Occurrences over all years per country, for the countries reporting the indicator."""
+        code = self.indicator_code(indicator)
+        mask = self.present[:, code]
+        return self.countries[mask], self.values[mask, code].sum(axis=1, dtype=np.int64)
+
+    def year_distribution(self, year):
+        """Occurrences of each disaster type across all countries in one year."""
+        return self.values[:, self._disaster_codes, self.year_code(year)].sum(axis=0, dtype=np.int64)
+
+    def year_totals(self, indicator):
+        """Occurrences per year across all countries for one indicator."""
+        return self.values[:, self.indicator_code(indicator)].sum(axis=0, dtype=np.int64)
+
+    def year_shares(self, indicator):
+        """Percentage of the indicator's all-time total that falls in each year."""
+        totals = self.year_totals(indicator)
+        overall = totals.sum()
+        if overall == 0:
+            return np.zeros(len(totals))
+        return totals / overall * 100
+
+
+def _array_writer(array):
+    def write(path):
+        # np.save() would append .npy to the temporary file's name.
+        with open(path, 'wb') as handle:
+            np.save(handle, np.ascontiguousarray(array))
+    return write
+
+
+def write_cube(cube, target_dir, version):
+    artifacts.write_with_manifest(
+        target_dir, {f"{name}.npy": _array_writer(getattr(cube, name)) for name in ARRAYS}, MANIFEST_FILE, {
+            'version': version,
+            'countries': cube.countries.tolist(),
+            'indicators': cube.indicators.tolist(),
+            'years': cube.years,
+        })
+
+
+def read_cube_manifest(target_dir):
+    path = os.path.join(target_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def open_cube(target_dir):
+    """Attach to a published cube; its arrays are read-only memory maps of the files."""
+    manifest = read_cube_manifest(target_dir)
+    arrays = [np.load(os.path.join(target_dir, f"{name}.npy"), mmap_mode='r') for name in ARRAYS]
+    return DisasterCube(manifest['countries'], manifest['indicators'], manifest['years'], *arrays)
+
+
+def _codes(column):
+    codes, labels = pd.factorize(column, sort=False)
+    return list(labels), codes
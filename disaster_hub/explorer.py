@@ -0,0 +1,45 @@
+# Server-side filtering, sorting and paging for the dataset viewer.
+#
+# Writing a whole frame with st.write sends every row and column to the browser on each
+# rerun; for Original.csv that is about half a megabyte, mostly the same long Source and
+# CTS_Full_Descriptor strings repeated on every row. The viewer instead works out which
+# rows match and in what order as an array of row positions, and only materializes the
+# visible page with the chosen columns. What is serialized stays the same size however
+# large the dataset grows.
+#
+# The frames arrive in the compact dtypes of disaster_hub.compact; the caller converts the
+# page back with compact.plain_frame() before showing it.
+
+import numpy as np
+
+# Columns of Original.csv that repeat the same descriptive text on every row; the viewer
+# leaves them out unless they are picked explicitly.
+DESCRIPTIVE_COLUMNS = ['Unit', 'Source', 'CTS_Code', 'CTS_Name', 'CTS_Full_Descriptor', 'Climate_Influence']
+
+
+def default_columns(frame):
+    return [column for column in frame.columns if column not in DESCRIPTIVE_COLUMNS]
+
+
+def select_rows(frame, filters=None, sort_by=None, ascending=True):
+    """Positions of the rows matching every filter ({column: allowed values}), in display order."""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values:
+            mask &= frame[column].isin(values).to_numpy()
+    positions = np.flatnonzero(mask)
+    if sort_by is not None:
+        keys = frame[sort_by].iloc[positions].reset_index(drop=True)
+        order = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
+
+
+def window(frame, positions, columns, page, page_size):
+    """The rows of one page (1-based), restricted to the given columns."""
+    start = (page - 1) * page_size
+    return frame.iloc[positions[start:start + page_size]][list(columns)]
@@ -0,0 +1,118 @@
+# Filtered extracts of the raw export, streamed in chunks.
+#
+# iter_export() reads Original.csv a chunk of rows at a time, keeps the requested
+# countries, indicators and years, and yields the encoded output piece by piece, so
+# neither the source nor the result is ever held in memory as a whole. CSV chunks are
+# plain text; Parquet output is written through a pyarrow ParquetWriter that receives one
+# row group per chunk and is drained after each one.
+#
+#     python -m disaster_hub.export out.parquet --countries India "United States" \
+#         --indicators Flood Storm --years 1995 2005
+
+import argparse
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from disaster_hub import ingest, loader
+
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+ID_COLUMNS = ['ObjectId', 'Country', 'ISO3', 'Indicator']
+
+
+def available_years(source=None):
+    source = source or loader.data_path(ingest.SOURCE_FILE)
+    header = ingest.read_source(source, nrows=0)
+    return [int(column[1:]) for column in ingest.year_columns(header)]
+
+
+def iter_chunks(countries=None, indicators=None, year_from=None, year_to=None, source=None, chunk_rows=10000):
+    """Yield the matching rows as frames with the layout of the cleaned table (years without the F)."""
+    source = source or loader.data_path(ingest.SOURCE_FILE)
+    years = [year for year in available_years(source)
+             if (year_from is None or year >= year_from) and (year_to is None or year <= year_to)]
+    raw_years = [f"F{year}" for year in years]
+    reader = ingest.read_source(source, usecols=ID_COLUMNS + raw_years, chunksize=chunk_rows)
+    for chunk in reader:
+        chunk['Indicator'] = ingest.short_indicator(chunk['Indicator'])
+        if countries:
+            chunk = chunk[chunk['Country'].isin(countries)]
+        if indicators:
+            chunk = chunk[chunk['Indicator'].isin(indicators)]
+        chunk = chunk[ID_COLUMNS + raw_years]
+        chunk.columns = ID_COLUMNS + [str(year) for year in years]
+        yield chunk
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file object that keeps what was written until take() hands it out."""
+
+    def __init__(self):
+        self._pieces = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._pieces)
+        self._pieces.clear()
+        return data
+
+
+def iter_export(fmt='CSV', **filters):
+    """Yield the bytes of the export file in the given format, one chunk at a time."""
+    chunks = iter_chunks(**filters)
+    if fmt == 'CSV':
+        header = True
+        for chunk in chunks:
+            yield chunk.to_csv(index=False, header=header).encode()
+            header = False
+        return
+
+    sink = _Drain()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            schema = pa.schema(
+                [(column, pa.int64() if column == 'ObjectId' else pa.string()) for column in ID_COLUMNS]
+                + [(column, pa.float64()) for column in chunk.columns[len(ID_COLUMNS):]]
+            )
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+def write_export(path, fmt='CSV', **filters):
+    with open(path, 'wb') as handle:
+        for data in iter_export(fmt, **filters):
+            handle.write(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export a filtered extract of Original.csv.')
+    parser.add_argument('output')
+    parser.add_argument('--countries', nargs='*')
+    parser.add_argument('--indicators', nargs='*')
+    parser.add_argument('--years', nargs=2, type=int, metavar=('FROM', 'TO'))
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help='output format (default: from the file extension)')
+    args = parser.parse_args(argv)
+    fmt = args.format or ('Parquet' if args.output.endswith('.parquet') else 'CSV')
+    year_from, year_to = args.years or (None, None)
+    write_export(args.output, fmt, countries=args.countries, indicators=args.indicators,
+                 year_from=year_from, year_to=year_to)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# Vectorized forecasting engines for short, sparse count series.
+#
+# Most series are 21 yearly counts, many of them mostly zero. Fitting a statsmodels ARIMA
+# to each one is slow and often fails outright. The engines here forecast a whole matrix
+# of series (one row per series) at once: every update is a NumPy operation over all
+# rows, and the only Python loop runs over the years.
+#
+# - SES: simple exponential smoothing, with the smoothing weight picked per series from
+#   a grid by the one-step-ahead squared error.
+# - Croston: smooths the non-zero demand sizes and the intervals between them separately
+#   and forecasts their ratio, the classic method for intermittent demand.
+# - TSB (Teunter-Syntetos-Babai): like Croston but smooths the probability of a
+#   non-zero year every year, so series that went quiet decay towards zero.
+#
+# All three give a flat forecast over the horizon.
+
+import time
+
+import numpy as np
+
+from disaster_hub import forecasting, loader
+from disaster_hub.forecasting import HORIZON
+
+SES_ALPHAS = np.linspace(0.05, 0.95, 19)
+
+
+def ses(values, steps=HORIZON):
+    values = np.asarray(values, dtype=np.float64)
+    alphas = SES_ALPHAS[:, None]
+    level = np.repeat(values[None, :, 0], len(SES_ALPHAS), axis=0)
+    sse = np.zeros_like(level)
+    for t in range(1, values.shape[1]):
+        error = values[:, t] - level
+        sse += error ** 2
+        level += alphas * error
+    best = sse.argmin(axis=0)
+    final = level[best, np.arange(values.shape[0])]
+    return np.repeat(final[:, None], steps, axis=1)
+
+
+def croston(values, steps=HORIZON, alpha=0.1):
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    size = np.zeros(n)
+    interval = np.ones(n)
+    since_last = np.ones(n)
+    started = np.zeros(n, dtype=bool)
+    for t in range(values.shape[1]):
+        demand = values[:, t]
+        occurred = demand > 0
+        size = np.where(occurred, np.where(started, size + alpha * (demand - size), demand), size)
+        interval = np.where(occurred, np.where(started, interval + alpha * (since_last - interval), since_last), interval)
+        started |= occurred
+        since_last = np.where(occurred, 1, since_last + 1)
+    forecast = np.where(started, size / interval, 0.0)
+    return np.repeat(forecast[:, None], steps, axis=1)
+
+
+def tsb(values, steps=HORIZON, alpha=0.1, beta=0.1):
+    values = np.asarray(values, dtype=np.float64)
+    occurred = values > 0
+    probability = occurred[:, 0].astype(np.float64)
+    size = values[:, 0].copy()
+    started = occurred[:, 0].copy()
+    for t in range(1, values.shape[1]):
+        demand = values[:, t]
+        probability += beta * (occurred[:, t] - probability)
+        size = np.where(occurred[:, t], np.where(started, size + alpha * (demand - size), demand), size)
+        started |= occurred[:, t]
+    return np.repeat((probability * size)[:, None], steps, axis=1)
+
+
+ENGINES = {
+    'SES': ses,
+    'Croston': croston,
+    'TSB': tsb,
+}
+
+
+def forecast_cube(cube, engine, steps=HORIZON):
+    """Forecast every country x indicator series of the cube in one call (countries x indicators x steps)."""
+    values = cube.values[:, :, forecasting.training_span(cube.years)]
+    countries, indicators, years = values.shape
+    forecast = ENGINES[engine](values.reshape(countries * indicators, years), steps)
+    return forecast.reshape(countries, indicators, steps)
+
+
+def load_forecast_cube(engine, steps=HORIZON):
+    path = loader.store_path()
+    return loader.get_or_build(('fast_forecast', path, engine, steps), [path],
+                               lambda: forecast_cube(loader.load_cube(), engine, steps))
+
+
+def holdout_errors(forecast, actual):
+    errors = forecast - actual
+    return {
+        'mae': float(np.abs(errors).mean()),
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+    }
+
+
+def evaluate(values, engine, holdout=HORIZON):
+    """Forecast the last `holdout` years of every row from the years before and score it."""
+    values = np.asarray(values, dtype=np.float64)
+    train, test = values[:, :-holdout], values[:, -holdout:]
+    started = time.perf_counter()
+    forecast = ENGINES[engine](train, holdout)
+    seconds = time.perf_counter() - started
+    return {
+        'engine': engine,
+        'series': len(values),
+        'seconds': seconds,
+        'series_per_second': len(values) / seconds if seconds else float('inf'),
+        **holdout_errors(forecast, test),
+    }
+
+
+def load_evaluation(holdout=HORIZON):
+    """Holdout scores of every engine over the series present in the source."""
+    path = loader.store_path()
+
+    def build():
+        cube = loader.load_cube()
+        _, _, values = cube.present_series()
+        values = values[:, forecasting.training_span(cube.years)]
+        return [evaluate(values, engine, holdout) for engine in ENGINES]
+
+    return loader.get_or_build(('fast_forecast_evaluation', path, holdout), [path], build)
@@ -0,0 +1,140 @@
+# Background forecast jobs for the Future Prediction page.
+#
+# Fitting an ARIMA model (and searching its order, for Auto ARIMA) takes from a fraction of
+# a second to several seconds. Run inside the script, it holds up the whole rerun of the
+# session that asked for it. Instead the page submits a job here and returns; the job runs
+# on a small pool of worker threads, and later reruns poll it for its progress and pick up
+# the result once it is done.
+#
+# - Jobs are keyed by what they compute (the hash of the series values and the model), so
+#   a second request for a series that is already queued or running, from any session,
+#   joins that job instead of fitting again. Finished jobs are kept for a while so every
+#   session waiting on one finds its result.
+# - The pool has DISASTER_HUB_FORECAST_WORKERS threads (default: half the CPUs, at least
+#   one) and accepts at most DISASTER_HUB_FORECAST_QUEUE waiting jobs; beyond that submit()
+#   raises QueueFull and the page asks the user to try again. Model fits are further capped
+#   per process by forecasting.fit_slots (as many as there are workers by default), which
+#   also covers the candidate fits of the order search and the API's Auto ARIMA requests,
+#   so a burst of users cannot take every core of the machine.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+WORKERS = int(os.environ.get('DISASTER_HUB_FORECAST_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+MAX_QUEUED = int(os.environ.get('DISASTER_HUB_FORECAST_QUEUE', 32))
+KEEP_FINISHED = 256
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    """One forecast computed in the background; its fields are read by the polling page."""
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.state = QUEUED
+        self.status = 'Waiting for a free worker'
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+    def elapsed(self):
+        return (self.finished or time.time()) - (self.started or self.submitted)
+
+    def update(self, status, progress=None):
+        """Called by the running task to report what it is doing."""
+        self.status = status
+        if progress is not None:
+            self.progress = min(1.0, max(self.progress, progress))
+
+
+_lock = threading.Lock()
+_executor = None
+_active = {}
+_finished = OrderedDict()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='forecast-job')
+    return _executor
+
+
+def _run(job, task):
+    job.state = RUNNING
+    job.started = time.time()
+    job.update('Running', 0.0)
+    try:
+        job.result = task(job)
+        job.state = DONE
+        job.update('Done', 1.0)
+    except Exception as error:
+        job.error = f"{type(error).__name__}: {error}"
+        job.state = FAILED
+        job.update('Failed')
+    finally:
+        job.finished = time.time()
+        with _lock:
+            _active.pop(job.key, None)
+            _finished[job.key] = job
+            while len(_finished) > KEEP_FINISHED:
+                _finished.popitem(last=False)
+
+
+def submit(key, task, label=''):
+    """Job computing task(job) in the background, or the existing job with the same key.
+
+    A job that failed is submitted again; one that finished is returned as it is.
+    """
+    with _lock:
+        job = _active.get(key) or _finished.get(key)
+        if job is not None and job.state != FAILED:
+            return job
+        if sum(other.state == QUEUED for other in _active.values()) >= MAX_QUEUED:
+            raise QueueFull(f"{MAX_QUEUED} forecasts are already waiting")
+        job = Job(key, label)
+        _active[key] = job
+        _finished.pop(key, None)
+        _pool().submit(_run, job, task)
+    return job
+
+
+def forget_finished():
+    """Drop the finished jobs, so the next request for them computes them again."""
+    with _lock:
+        _finished.clear()
+
+
+def queue_position(job):
+    """Number of jobs submitted before this one that are still waiting."""
+    with _lock:
+        return sum(other.state == QUEUED and other.submitted < job.submitted for other in _active.values())
+
+
+def stats():
+    with _lock:
+        return {
+            'workers': WORKERS,
+            'queued': sum(job.state == QUEUED for job in _active.values()),
+            'running': sum(job.state == RUNNING for job in _active.values()),
+            'finished': len(_finished),
+        }
@@ -0,0 +1,186 @@
+# ARIMA forecasting shared by the Future Prediction page and the batch job in
+# disaster_hub.batch_forecast, so a stored forecast and a live one come out of the same
+# code.
+#
+# Fits go through a process-wide memo cache keyed by a hash of the series values, the
+# model order and the horizon, not by country or indicator: many small countries have
+# identical (often all-zero) series and they all share one fit. The cache is bounded by
+# entry count and size and evicts the least recently used forecasts first. Its limits can
+# be set with the DISASTER_HUB_FORECAST_CACHE_ENTRIES and
+# DISASTER_HUB_FORECAST_CACHE_BYTES environment variables.
+#
+# The engines train on the years from TRAIN_FROM (the first year of the cleaned tables,
+# 2001) on, although the store and the cube reach back to 1980 for the analysis pages: the
+# earlier decades are much sparser and would pull every forecast down. training_span()
+# picks those years out of the cube's year axis.
+#
+# At most DISASTER_HUB_MAX_FITS models (default: as many as forecast job workers, half the
+# CPUs) are fitted at the same time in a process, whichever thread pool asks for them;
+# further fits wait for a free slot, so the app always leaves cores to serve the pages.
+#
+# Short, mostly-zero count series routinely make statsmodels warn about convergence and
+# starting parameters; the outcome is recorded in the diagnostics instead. Fits run on
+# threads, where toggling the warning filters per fit (warnings.catch_warnings) is not
+# safe, so quiet_statsmodels() installs ignore filters for those categories once per
+# process.
+
+import hashlib
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import cleaned, forecast_jobs
+
+ORDER = (1, 1, 1)
+HORIZON = 5
+TRAIN_FROM = cleaned.FIRST_YEAR
+
+MAX_FITS = int(os.environ.get('DISASTER_HUB_MAX_FITS', forecast_jobs.WORKERS))
+fit_slots = threading.BoundedSemaphore(MAX_FITS)
+
+_quiet = False
+_quiet_lock = threading.Lock()
+
+
+def quiet_statsmodels():
+    """Ignore the warnings statsmodels raises on routine fits, for the whole process."""
+    global _quiet
+    with _quiet_lock:
+        if _quiet:
+            return
+        from statsmodels.tools.sm_exceptions import (ConvergenceWarning, EstimationWarning, InterpolationWarning,
+                                                      ValueWarning)
+        for category in (ConvergenceWarning, EstimationWarning, InterpolationWarning, ValueWarning):
+            warnings.filterwarnings('ignore', category=category)
+        warnings.filterwarnings('ignore', category=RuntimeWarning, module='statsmodels')
+        # Raised on behalf of the caller of kpss(), about the shape of its result.
+        warnings.filterwarnings('ignore', message='kpss currently returns', category=FutureWarning)
+        _quiet = True
+
+
+def training_span(years):
+    """Slice of the year axis (oldest first) the engines train on."""
+    return slice(sum(int(year) < TRAIN_FROM for year in years), None)
+
+
+def year_index(years):
+    return pd.date_range(start=str(years[0]), periods=len(years), freq='YS')
+
+
+def forecast_years(years, steps=HORIZON):
+    last = int(years[-1])
+    return list(range(last + 1, last + 1 + steps))
+
+
+def fit_and_forecast_arima(values, years, order=ORDER, steps=HORIZON, maxiter=None):
+    """Fit an ARIMA model to one yearly series and forecast the following years.
+
+    Returns the forecast values and a dict of fit diagnostics. Series the model cannot
+    be fitted to (statsmodels raises ValueError) get a flat zero forecast, as before.
+    maxiter caps the optimizer's iterations (statsmodels' default when None).
+    """
+    # statsmodels takes over a second to import and only forecasting needs it.
+    from statsmodels.tsa.arima.model import ARIMA
+
+    quiet_statsmodels()
+    started = time.perf_counter()
+    series = pd.Series(np.asarray(values, dtype=float), index=year_index(years))
+    try:
+        with fit_slots:
+            results = ARIMA(series, order=order).fit(method_kwargs={'maxiter': maxiter} if maxiter else None)
+        forecast = results.forecast(steps=steps).to_numpy()
+        diagnostics = {
+            'aic': float(results.aic),
+            'bic': float(results.bic),
+            'converged': bool(results.mle_retvals.get('converged', True)),
+            'error': '',
+        }
+    except ValueError as error:
+        forecast = np.zeros(steps)
+        diagnostics = {'aic': np.nan, 'bic': np.nan, 'converged': False, 'error': str(error)}
+    diagnostics['fit_seconds'] = time.perf_counter() - started
+    return forecast, diagnostics
+
+
+class ForecastCache:
+    """Least-recently-used map from forecast_key() to (forecast, diagnostics)."""
+
+    # Rough per-entry cost of the key, the diagnostics dict and the bookkeeping.
+    ENTRY_OVERHEAD = 1024
+
+    def __init__(self, max_entries=4096, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += entry[1]['fit_seconds']
+            return entry
+
+    def put(self, key, entry):
+        size = entry[0].nbytes + self.ENTRY_OVERHEAD
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[0].nbytes + self.ENTRY_OVERHEAD
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'seconds_saved': self.seconds_saved,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+forecast_cache = ForecastCache(
+    max_entries=int(os.environ.get('DISASTER_HUB_FORECAST_CACHE_ENTRIES', 4096)),
+    max_bytes=int(os.environ.get('DISASTER_HUB_FORECAST_CACHE_BYTES', 16 * 1024 * 1024)),
+)
+
+
+def forecast_key(values, order=ORDER, steps=HORIZON):
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(repr((tuple(order), steps)).encode())
+    return digest.hexdigest()
+
+
+def cached_forecast(values, years, order=ORDER, steps=HORIZON):
+    """fit_and_forecast_arima() through the shared cache; identical series share one fit."""
+    key = forecast_key(values, order, steps)
+    entry = forecast_cache.get(key)
+    if entry is None:
+        entry = fit_and_forecast_arima(values, years, order, steps)
+        forecast_cache.put(key, entry)
+    return entry
@@ -0,0 +1,135 @@
+# Ingest step that turns the raw IMF climate-disaster export (data/Original.csv) into the
+# columnar store the app reads at runtime (data/disasters.parquet).
+#
+# The store keeps one row per (Country, Indicator) with typed columns: short indicator
+# names ("Drought" instead of "Climate related disasters frequency, Number of
+# Disasters: Drought"), the ISO codes, and one unsigned integer column per year with
+# missing years stored as 0. The long descriptive columns that repeat the same text on
+# every row are dropped. The pages read projected slices of this single file instead of
+# parsing Main.csv and the per-disaster CSV files. It keeps every
+# year of the export (1980 onwards); the year axis of everything built from it is read
+# from its columns rather than fixed in the code.
+#
+# The same run computes the rollup tables in disaster_hub.aggregates and writes them to
+# data/aggregates/, and publishes the country x indicator x year cube as memory-mappable
+# arrays in data/cube/, both stamped with the data version: the digest of the source file
+# together with the years the store covers. Running this module also
+# brings the cleaned CSV tables (Main.csv and the per-disaster files) up to date; see
+# disaster_hub.cleaned.
+#
+# Run it by hand with `python -m disaster_hub.ingest`; the loader also runs it on
+# demand whenever the store is missing or older than the source file.
+
+import hashlib
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from disaster_hub import aggregates, artifacts, regions
+from disaster_hub.cube import DisasterCube, write_cube
+
+SOURCE_FILE = 'Original.csv'
+STORE_FILE = 'disasters.parquet'
+AGGREGATES_DIR = 'aggregates'
+CUBE_DIR = 'cube'
+INDICATOR_PREFIX = 'Climate related disasters frequency, Number of Disasters: '
+ID_COLUMNS = ['ObjectId', 'Country', 'ISO2', 'ISO3', 'Indicator']
+
+
+def source_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_source(path, **options):
+    # The export starts with a UTF-8 byte order mark that would otherwise end up in the
+    # name of the first column. Only empty cells are missing values: Namibia's ISO2 code
+    # is "NA".
+    return pd.read_csv(path, encoding='utf-8-sig', keep_default_na=False, na_values=[''], **options)
+
+
+def year_columns(raw):
+    return [column for column in raw.columns if column.startswith('F') and column[1:].isdigit()]
+
+
+def store_years(columns):
+    """Year columns of the store (or a frame built from it), oldest first."""
+    return sorted((column for column in columns if column.isdigit()), key=int)
+
+
+def short_indicator(indicator):
+    return indicator.str.replace(INDICATOR_PREFIX, '', regex=False)
+
+
+def build_store_frame(raw):
+    raw_years = year_columns(raw)
+    frame = raw[ID_COLUMNS].copy()
+    frame['ObjectId'] = frame['ObjectId'].astype('int32')
+    frame['Indicator'] = short_indicator(frame['Indicator'])
+    counts = raw[raw_years].fillna(0).astype('uint16')
+    counts.columns = [column[1:] for column in raw_years]
+    return pd.concat([frame, counts], axis=1)
+
+
+def write_atomic(table, target, metadata):
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    artifacts.replace_atomic(target, lambda path: pq.write_table(table, path, compression='zstd'))
+
+
+def data_version(source_sha256, years):
+    """Version stamped on everything built from the store: the source digest and the year axis."""
+    return hashlib.sha256(f"{source_sha256}:{','.join(years)}".encode()).hexdigest()
+
+
+def store_version(path):
+    schema = pq.read_schema(path)
+    return data_version(schema.metadata[b'source_sha256'].decode(), store_years(schema.names))
+
+
+def read_store_years(path):
+    return store_years(pq.read_schema(path).names)
+
+
+def build_store(source, target):
+    frame = build_store_frame(read_source(source))
+    digest = source_digest(source)
+    version = data_version(digest, store_years(frame.columns))
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    write_atomic(table, target, {b'source_sha256': digest.encode()})
+    build_aggregates(frame, os.path.join(os.path.dirname(target), AGGREGATES_DIR), version)
+    build_cube(frame, os.path.join(os.path.dirname(target), CUBE_DIR), version)
+    return frame
+
+
+def build_aggregates(frame, target_dir, version):
+    # The regions table lives in the data directory, next to the aggregates directory.
+    regions_path = os.path.join(os.path.dirname(os.path.abspath(target_dir)), regions.REGIONS_FILE)
+    years = store_years(frame.columns)
+    tables = aggregates.compute_aggregates(frame, years, regions.read_regions(regions_path))
+    aggregates.write_aggregates(tables, target_dir, version, years, source_digest(regions_path))
+
+
+def build_cube(frame, target_dir, version):
+    write_cube(DisasterCube.from_frame(frame, store_years(frame.columns)), target_dir, version)
+
+
+def main(argv=None):
+    from disaster_hub import cleaned, loader
+
+    argv = sys.argv[1:] if argv is None else argv
+    source = argv[0] if argv else loader.data_path(SOURCE_FILE)
+    target = argv[1] if len(argv) > 1 else loader.data_path(STORE_FILE)
+    frame = build_store(source, target)
+    print(f"Wrote {len(frame)} rows to {target} "
+          f"({os.path.getsize(source)} bytes of CSV -> {os.path.getsize(target)} bytes)")
+    cleaned.report(cleaned.update(source, os.path.dirname(os.path.abspath(target))))
+
+
+if __name__ == '__main__':
+    main()
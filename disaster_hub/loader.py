@@ -0,0 +1,181 @@
+# Process-wide cache for the datasets under data/.
+#
+# The analytic pages read from the columnar store built by disaster_hub.ingest; the store
+# is (re)built from Original.csv on first use whenever it is missing or out of date.
+#
+# Streamlit re-executes the whole script on every widget interaction, so reading the
+# CSV files inside the page functions meant parsing them again on every click, for
+# every session. Everything loaded through this module is parsed once per process and
+# the same object is handed to every session and page. An entry is rebuilt as soon as
+# the modification time or size of one of the files it was built from changes.
+#
+# Objects returned from here are shared between sessions: callers must treat them as
+# read-only and copy before modifying anything in place.
+#
+# The cube is the exception: it is published once per data version as memory-mapped
+# arrays (see disaster_hub.cube), which every process attaches to instead of loading.
+#
+# Frames are kept in the compact representation of disaster_hub.compact (categorical
+# strings, narrow unsigned counts); memory_stats() reports what that saves.
+
+import os
+import threading
+
+import pandas as pd
+
+from disaster_hub import aggregates, cleaned, compact, cube, ingest, regions
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+_cache = {}
+_lock = threading.RLock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_memory = {}
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_or_build(key, paths, build):
+    """Return the cached result of build() for key, rebuilding it when any of paths changed."""
+    signature = tuple(file_signature(path) for path in paths)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == signature:
+            _stats['hits'] += 1
+            return entry[1]
+        if entry is not None:
+            _stats['invalidations'] += 1
+        _stats['misses'] += 1
+        # Building under the lock means concurrent sessions wait for a single parse
+        # instead of all parsing the same file at once.
+        value = build()
+        _cache[key] = (signature, value)
+        return value
+
+
+def compacted(key, frame):
+    """Compact representation of frame, recording its size before and after under key."""
+    result = compact.compact_frame(frame)
+    with _lock:
+        _memory[key] = (compact.memory_bytes(frame), compact.memory_bytes(result))
+    return result
+
+
+def load_csv(name):
+    path = data_path(name)
+    return get_or_build(('csv', path), [path], lambda: pd.read_csv(path))
+
+
+def load_source():
+    """The raw Original.csv export, as published."""
+    path = data_path(ingest.SOURCE_FILE)
+    key = ('source', path)
+    return get_or_build(key, [path], lambda: compacted(key, ingest.read_source(path)))
+
+
+def store_path():
+    source, store = data_path(ingest.SOURCE_FILE), data_path(ingest.STORE_FILE)
+    with _lock:
+        if not os.path.exists(store) or os.path.getmtime(store) < os.path.getmtime(source):
+            ingest.build_store(source, store)
+    return store
+
+
+def store_version():
+    """Version of the data: the digest of the source file the store was built from and its years."""
+    path = store_path()
+    return get_or_build(('store_version', path), [path], lambda: ingest.store_version(path))
+
+
+def years():
+    """Every year the store covers, oldest first, as strings."""
+    path = store_path()
+    return get_or_build(('years', path), [path], lambda: ingest.read_store_years(path))
+
+
+def regions_version():
+    """Digest of the regions table the rollups are computed with."""
+    path = data_path(regions.REGIONS_FILE)
+    return get_or_build(('regions_version', path), [path], lambda: ingest.source_digest(path))
+
+
+def aggregates_dir():
+    target_dir = data_path(ingest.AGGREGATES_DIR)
+    version = store_version()
+    with _lock:
+        manifest = aggregates.read_manifest(target_dir)
+        if manifest is None or manifest['version'] != version or manifest.get('regions') != regions_version():
+            ingest.build_aggregates(load_store(), target_dir, version)
+    return target_dir
+
+
+def load_rollups():
+    """Return the rollup tables precomputed for the current version of the store."""
+    target_dir = aggregates_dir()
+    manifest_path = os.path.join(target_dir, aggregates.MANIFEST_FILE)
+    return get_or_build(('rollups', target_dir), [manifest_path], lambda: aggregates.read_aggregates(target_dir))
+
+
+def load_store(columns=None):
+    """Read the store, keeping only the given columns."""
+    path = store_path()
+    columns = list(columns) if columns is not None else None
+    key = ('store', path, tuple(columns) if columns is not None else None)
+    return get_or_build(key, [path], lambda: compacted(key, pd.read_parquet(path, columns=columns)))
+
+
+def load_table():
+    """Return the cleaned table (the layout of Main.csv)."""
+    path = store_path()
+
+    key = ('table', path)
+
+    def build():
+        # The cleaned tables start at cleaned.FIRST_YEAR.
+        table_years = [year for year in years() if int(year) >= cleaned.FIRST_YEAR]
+        frame = load_store(['ObjectId', 'Country', 'Indicator'] + table_years).copy()
+        frame['Total'] = frame[table_years].sum(axis=1)
+        return compacted(key, frame)
+
+    return get_or_build(key, [path], build)
+
+
+def cube_dir():
+    target_dir = data_path(ingest.CUBE_DIR)
+    version = store_version()
+    with _lock:
+        manifest = cube.read_cube_manifest(target_dir)
+        if manifest is None or manifest['version'] != version:
+            ingest.build_cube(load_store(columns=['Country', 'Indicator'] + years()), target_dir, version)
+    return target_dir
+
+
+def load_cube():
+    """Return the country x indicator x year cube shared by all pages (and processes)."""
+    target_dir = cube_dir()
+    manifest_path = os.path.join(target_dir, cube.MANIFEST_FILE)
+    return get_or_build(('cube', target_dir), [manifest_path], lambda: cube.open_cube(target_dir))
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = len(_cache)
+    return stats
+
+
+def memory_stats():
+    """Bytes held by the loaded frames, and what they would take with the dtypes they were read with."""
+    with _lock:
+        live = [_memory[key] for key in _cache if key in _memory]
+    original = sum(before for before, _ in live)
+    held = sum(after for _, after in live)
+    return {'frames': len(live), 'bytes': held, 'original_bytes': original, 'saved_bytes': original - held}
+
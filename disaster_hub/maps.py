@@ -0,0 +1,63 @@
+# World maps of the per-country totals, keyed by ISO3 code.
+#
+# Matching locations by country name made Plotly resolve strings such as "Afghanistan,
+# Islamic Rep. of" on every render, and names it could not resolve were silently left off
+# the map. The source already carries ISO3 codes, so the maps locate countries by code and
+# only use the names as hover labels. The figure for each indicator is built once per data
+# version and handed to every session; Streamlit only has to serialize it.
+#
+# Maps of a narrower range of years are far more numerous (one per slider position) and
+# each is a few hundred KB, so they are not kept with the loader's data. The last
+# DISASTER_HUB_RANGE_MAPS of them are kept in a small LRU of their own and built outside
+# its lock, so a visitor dragging the slider does not hold up other sessions.
+
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from disaster_hub import loader, startup
+
+RANGE_MAPS = int(os.environ.get('DISASTER_HUB_RANGE_MAPS', 32))
+
+_ranged = OrderedDict()
+_ranged_lock = threading.Lock()
+
+
+def _ranged_map(key, build):
+    with _ranged_lock:
+        figure = _ranged.get(key)
+        if figure is not None:
+            _ranged.move_to_end(key)
+            return figure
+    figure = build()
+    with _ranged_lock:
+        _ranged[key] = figure
+        while len(_ranged) > RANGE_MAPS:
+            _ranged.popitem(last=False)
+    return figure
+
+
+def choropleth(indicator, width=None, height=None, zero_based=False, first=None, last=None):
+    """World map of each country's total for the indicator (from first to last, all years by
+    default), shared between sessions."""
+    rollups = loader.load_rollups()
+    years = loader.years()
+    ranged = first is not None and (first, last) != (years[0], years[-1])
+    key = ('choropleth', rollups.version, indicator, width, height, zero_based)
+
+    def build():
+        px = startup.timed_import('plotly.express')
+        data = rollups.country_totals_table(indicator)
+        if ranged:
+            countries, totals = loader.load_cube().range_totals(indicator, first, last)
+            data = data.assign(Total=pd.Series(totals, index=countries).reindex(data['Country']).to_numpy())
+        options = {'range_color': (0, data['Total'].max())} if zero_based else {}
+        return px.choropleth(data, locations='ISO3', locationmode='ISO-3', color='Total',
+                             hover_name='Country', hover_data={'ISO3': False},
+                             scope='world', width=width, height=height, **options)
+
+    if ranged:
+        return _ranged_map(key + (first, last), build)
+    return loader.get_or_build(key, [loader.store_path()], build)
@@ -0,0 +1,180 @@
+# Timing spans around the sections of each page.
+#
+# A page is a run of sections (a chart with its widgets, the map, the pie, ...) and each
+# section does up to four things: load data, transform it, build the chart and emit it to
+# the browser. The pages wrap every section in section() and its steps in span():
+#
+#     with metrics.section('frequency'):
+#         with metrics.span('load'):
+#             ...
+#
+# Each span is recorded under (page, section, phase); the section itself is recorded under
+# the phase 'total'. The last WINDOW durations of every key are kept in memory for the
+# sidebar debug panel, which reports their p50 and p95.
+#
+# When DISASTER_HUB_METRICS_FILE is set, the spans of every script run (or rerun of a single
+# section) are also written out at the end of the run, so percentiles can be tracked across
+# sessions and processes:
+#
+#   * a file ending in .prom is rewritten with Prometheus summaries (count, sum, p50, p95)
+#     of this process, ready for the node exporter's textfile collector;
+#   * any other file gets one JSON object per span appended to it (JSON lines), which
+#     `python -m disaster_hub.metrics FILE` summarises.
+#
+# "{pid}" in the file name is replaced by the process id, so replicas do not overwrite
+# each other's Prometheus files.
+
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+PHASES = ('load', 'transform', 'chart', 'emit', 'total')
+WINDOW = int(os.environ.get('DISASTER_HUB_METRICS_WINDOW', 1000))
+
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))
+_totals = defaultdict(lambda: [0, 0.0])
+_pending = []
+_lock = threading.Lock()
+
+_page = contextvars.ContextVar('metrics_page', default='')
+_section = contextvars.ContextVar('metrics_section', default='')
+
+
+def metrics_file():
+    path = os.environ.get('DISASTER_HUB_METRICS_FILE')
+    return path.replace('{pid}', str(os.getpid())) if path else None
+
+
+def record(page, section, phase, seconds):
+    key = (page, section, phase)
+    with _lock:
+        _samples[key].append(seconds)
+        total = _totals[key]
+        total[0] += 1
+        total[1] += seconds
+        _pending.append({'time': time.time(), 'pid': os.getpid(), 'page': page,
+                         'section': section, 'phase': phase, 'seconds': seconds})
+
+
+@contextmanager
+def page(name):
+    """Attribute the sections recorded inside the block to the page name."""
+    token = _page.set(name)
+    try:
+        yield
+    finally:
+        _page.reset(token)
+
+
+def current_page():
+    """Name of the page being recorded, or '' outside of page()."""
+    return _page.get()
+
+
+@contextmanager
+def section(name):
+    token = _section.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(_page.get(), name, 'total', time.perf_counter() - started)
+        _section.reset(token)
+
+
+@contextmanager
+def span(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(_page.get(), _section.get(), phase, time.perf_counter() - started)
+
+
+def summary(page=None):
+    """Count, last, p50 and p95 (in seconds) of every recorded key, optionally for one page."""
+    with _lock:
+        samples = {key: np.array(values) for key, values in _samples.items() if page is None or key[0] == page}
+        totals = {key: tuple(_totals[key]) for key in samples}
+    return [
+        {
+            'page': key[0], 'section': key[1], 'phase': key[2],
+            'count': totals[key][0], 'sum': totals[key][1], 'last': values[-1],
+            'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+        }
+        for key, values in sorted(samples.items(), key=lambda item: (item[0][0], item[0][1], PHASES.index(item[0][2])))
+    ]
+
+
+def prometheus_text(rows):
+    lines = [
+        '# HELP disaster_hub_section_seconds Time spent in each phase of a page section.',
+        '# TYPE disaster_hub_section_seconds summary',
+    ]
+    for row in rows:
+        labels = ','.join(f'{name}="{_escape(row[name])}"' for name in ('page', 'section', 'phase'))
+        for quantile in ('p50', 'p95'):
+            lines.append(f'disaster_hub_section_seconds{{{labels},quantile="0.{quantile[1:]}"}} {row[quantile]:.6f}')
+        lines.append(f'disaster_hub_section_seconds_sum{{{labels}}} {row["sum"]:.6f}')
+        lines.append(f'disaster_hub_section_seconds_count{{{labels}}} {row["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def flush():
+    """Write the spans recorded since the last flush to the metrics file, if one is configured."""
+    with _lock:
+        pending = _pending[:]
+        _pending.clear()
+    path = metrics_file()
+    if path is None or not pending:
+        return
+    if path.endswith('.prom'):
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, 'w') as handle:
+            handle.write(prometheus_text(summary()))
+        os.replace(tmp_path, path)
+    else:
+        payload = ''.join(json.dumps(event) + '\n' for event in pending)
+        with _lock, open(path, 'a') as handle:
+            handle.write(payload)
+
+
+def summarise_file(path):
+    """p50 and p95 per (page, section, phase) over every span in a JSON-lines metrics file."""
+    durations = defaultdict(list)
+    with open(path) as handle:
+        for line in handle:
+            event = json.loads(line)
+            durations[(event['page'], event['section'], event['phase'])].append(event['seconds'])
+    return [
+        {
+            'page': key[0], 'section': key[1], 'phase': key[2], 'count': len(values),
+            'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+        }
+        for key, values in sorted(durations.items())
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarise a JSON-lines file of page section timings.')
+    parser.add_argument('path')
+    args = parser.parse_args(argv)
+    print(f"{'page':30} {'section':20} {'phase':10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in summarise_file(args.path):
+        print(f"{row['page']:30} {row['section']:20} {row['phase']:10} {row['count']:7} "
+              f"{row['p50'] * 1000:9.1f} {row['p95'] * 1000:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+# Automatic ARIMA order selection.
+#
+# The pages fit every series with the same order (1, 1, 1), which suits few of them. Here
+# the order is chosen per series, the way auto.arima does it:
+#
+# - d comes from a KPSS test: 0 when the series looks level-stationary at 5%, else 1.
+#   Information criteria of models with different d are not comparable, so d is fixed
+#   before (p, q) are compared.
+# - (p, q) candidates up to MAX_P and MAX_Q are fitted in rounds of growing p + q, each
+#   round in parallel on the given executor. Fits run with a small iteration budget;
+#   candidates that fail or do not converge within it are dropped, and the search stops
+#   after the first round that does not improve the criterion (AIC or BIC).
+#
+# `python -m disaster_hub.order_search` searches every series on a process pool and keeps
+# the winning orders in data/orders/, stamped with the data version. order_for() serves
+# them from there, or searches on demand and remembers the result for the process, so a
+# series is only searched once.
+#
+#     python -m disaster_hub.order_search [--workers N] [--criterion aic|bic]
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub import artifacts, forecasting, loader
+
+CRITERIA = ('aic', 'bic')
+MAX_P = 2
+MAX_Q = 2
+MAXITER = 50
+ORDERS_DIR = 'orders'
+MANIFEST_FILE = 'manifest.json'
+
+_selected = {}
+_lock = threading.Lock()
+_executor = None
+
+
+def differencing_order(values):
+    from statsmodels.tsa.stattools import kpss
+
+    values = np.asarray(values, dtype=float)
+    if np.ptp(values) == 0:
+        return 0
+    # KPSS warns when the p-value falls outside its lookup table; it is clipped.
+    forecasting.quiet_statsmodels()
+    pvalue = kpss(values, regression='c', nlags='auto')[1]
+    return 0 if pvalue > 0.05 else 1
+
+
+def candidate_rounds(d, max_p=MAX_P, max_q=MAX_Q):
+    """Candidate orders grouped by p + q, simplest first."""
+    return [
+        [(p, d, k - p) for p in range(max_p + 1) if 0 <= k - p <= max_q]
+        for k in range(max_p + max_q + 1)
+    ]
+
+
+def _fit_candidate(task):
+    values, years, order, maxiter = task
+    _, diagnostics = forecasting.fit_and_forecast_arima(values, years, order, steps=1, maxiter=maxiter)
+    return order, diagnostics
+
+
+def select_order(values, years, criterion='aic', executor=None, max_p=MAX_P, max_q=MAX_Q, maxiter=MAXITER,
+                 progress=None):
+    """Best order for one series and the list of candidates tried.
+
+    Falls back to forecasting.ORDER when no candidate converges. progress, if given, is
+    called with (round, rounds) before each round of candidates is fitted.
+    """
+    values = list(np.asarray(values, dtype=float))
+    fit = executor.map if executor is not None else map
+    best, best_score = None, np.inf
+    trials = []
+    rounds = candidate_rounds(differencing_order(values), max_p, max_q)
+    for number, candidates in enumerate(rounds):
+        if progress is not None:
+            progress(number, len(rounds))
+        improved = False
+        for order, diagnostics in fit(_fit_candidate, [(values, years, order, maxiter) for order in candidates]):
+            score = diagnostics[criterion]
+            kept = diagnostics['converged'] and not diagnostics['error'] and np.isfinite(score)
+            trials.append({'order': order, **diagnostics, 'kept': kept})
+            if kept and score < best_score:
+                best, best_score, improved = order, score, True
+        if best is not None and not improved:
+            break
+    return (best or forecasting.ORDER), trials
+
+
+def order_key(values, criterion):
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(repr((criterion, MAX_P, MAX_Q, MAXITER)).encode())
+    return digest.hexdigest()
+
+
+def _search_task(task):
+    country, indicator, values, years, criterion = task
+    started = time.perf_counter()
+    order, trials = select_order(values, years, criterion)
+    return {
+        'Country': country,
+        'Indicator': indicator,
+        'Key': order_key(values, criterion),
+        'p': order[0],
+        'd': order[1],
+        'q': order[2],
+        'Candidates': len(trials),
+        'Dropped': sum(not trial['kept'] for trial in trials),
+        'Seconds': time.perf_counter() - started,
+    }
+
+
+def search_all(workers=None, criterion='aic', target_dir=None):
+    """Search the order of every series on a process pool and store the winners."""
+    target_dir = target_dir or loader.data_path(ORDERS_DIR)
+    cube = loader.load_cube()
+    span = forecasting.training_span(cube.years)
+    country_codes, indicator_codes, values = cube.present_series()
+    tasks = [
+        (country, indicator, series[span].tolist(), cube.years[span], criterion)
+        for country, indicator, series in zip(cube.countries[country_codes], cube.indicators[indicator_codes], values)
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        orders = pd.DataFrame(list(pool.map(_search_task, tasks, chunksize=8)))
+    manifest = {
+        'version': loader.store_version(),
+        'criterion': criterion,
+        'max_p': MAX_P,
+        'max_q': MAX_Q,
+        'series': len(orders),
+        'candidates': int(orders['Candidates'].sum()),
+        'dropped': int(orders['Dropped'].sum()),
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+    write_orders(target_dir, orders, manifest)
+    return manifest
+
+
+def write_orders(target_dir, orders, manifest):
+    artifacts.write_with_manifest(target_dir, {'orders.parquet': artifacts.parquet_writer(orders)}, MANIFEST_FILE,
+                                  manifest)
+
+
+def read_orders(target_dir):
+    with open(os.path.join(target_dir, MANIFEST_FILE)) as handle:
+        manifest = json.load(handle)
+    return StoredOrders(pd.read_parquet(os.path.join(target_dir, 'orders.parquet')), manifest)
+
+
+def load_orders(target_dir=None):
+    """Stored orders for the current data, or None when there are none or they are stale."""
+    target_dir = target_dir or loader.data_path(ORDERS_DIR)
+    manifest_path = os.path.join(target_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    stored = loader.get_or_build(('orders', target_dir), [manifest_path], lambda: read_orders(target_dir))
+    return stored if stored.version == loader.store_version() else None
+
+
+class StoredOrders:
+
+    def __init__(self, orders, manifest):
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.criterion = manifest['criterion']
+        self._orders = {
+            (row.Country, row.Indicator): (row.Key, (int(row.p), int(row.d), int(row.q)))
+            for row in orders.itertuples(index=False)
+        }
+
+    def lookup(self, country, indicator, key):
+        """Stored order of one series, or None when it was not searched or its values changed."""
+        found = self._orders.get((country, indicator))
+        return found[1] if found is not None and found[0] == key else None
+
+
+def _thread_pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=forecasting.MAX_FITS, thread_name_prefix='order-search')
+        return _executor
+
+
+def known_order(country, indicator, values, criterion='aic'):
+    """Stored or already searched order of one series and its source, or None."""
+    key = order_key(values, criterion)
+    stored = load_orders()
+    if stored is not None and stored.criterion == criterion:
+        order = stored.lookup(country, indicator, key)
+        if order is not None:
+            return order, 'stored'
+    with _lock:
+        order = _selected.get(key)
+    return (order, 'cached') if order is not None else None
+
+
+def order_for(country, indicator, values, years, criterion='aic', progress=None):
+    """Order for one series and where it came from: 'stored', 'cached' or 'searched'."""
+    found = known_order(country, indicator, values, criterion)
+    if found is not None:
+        return found
+    key = order_key(values, criterion)
+    order, _ = select_order(values, years, criterion, executor=_thread_pool(), progress=progress)
+    with _lock:
+        _selected[key] = order
+    return order, 'searched'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pick the ARIMA order of every series by AIC or BIC.')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--criterion', choices=CRITERIA, default='aic')
+    args = parser.parse_args(argv)
+    manifest = search_all(workers=args.workers, criterion=args.criterion)
+    print(f"Searched {manifest['series']} series in {manifest['elapsed_seconds']:.1f}s "
+          f"({manifest['candidates']} candidate fits, {manifest['dropped']} dropped)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# Country -> subregion -> region -> world hierarchy used to roll the counts up.
+#
+# data/regions.csv maps the ISO3 code of every country in the export to its subregion and
+# region of the UN M49 geoscheme (e.g. IND -> Southern Asia -> Asia). Former states and
+# territories that M49 does not list on their own (the Soviet Union, the Azores, the
+# Canary Islands, ...) are placed with the area they belong to. Countries missing from the
+# table are rolled up under UNASSIGNED rather than dropped, so every level still adds up
+# to the world total.
+#
+# The rollups themselves are computed once per data version with the other aggregates
+# (see disaster_hub.aggregates); edit the table and the next run recomputes them.
+
+import pandas as pd
+
+REGIONS_FILE = 'regions.csv'
+LEVELS = ('Subregion', 'Region')
+WORLD = 'World'
+UNASSIGNED = 'Unassigned'
+
+
+def read_regions(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def country_groups(iso3, regions, level):
+    """Group at `level` of each ISO3 code, in the order given."""
+    mapping = regions.set_index('ISO3')[level]
+    return mapping.reindex(list(iso3)).fillna(UNASSIGNED).to_numpy()
@@ -0,0 +1,85 @@
+# Cold-start bookkeeping for the app.
+#
+# Heavy optional dependencies (plotly for the maps and pies, statsmodels for ARIMA) are
+# imported by the code that needs them rather than at the top of streamlit_app.py, so a
+# fresh process only pays for what the first page uses. warm_up() then imports the rest on
+# a background thread once the first page has been drawn, so later page switches do not
+# stall on an import either.
+#
+# Every import done through timed_import() and every measure() block is recorded once per
+# process; report() returns them for the sidebar, and `python -m disaster_hub.startup`
+# prints the import cost of each dependency in a fresh interpreter so regressions are easy
+# to spot.
+
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+HEAVY_MODULES = ('plotly.express', 'statsmodels.tsa.arima.model')
+APP_MODULES = ('numpy', 'pandas', 'pyarrow.parquet', 'altair', 'streamlit') + HEAVY_MODULES
+
+_timings = {}
+_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def record(name, seconds):
+    """Record a startup timing; only the first measurement of a name in a process is kept."""
+    with _lock:
+        _timings.setdefault(name, seconds)
+
+
+@contextmanager
+def measure(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def timed_import(name):
+    # A module can be in sys.modules while another thread (the warm-up, or another
+    # session) is still importing it; import_module waits for that import to finish, so
+    # only the timing is skipped for modules that are already there.
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with measure(f"import {name}"):
+        return importlib.import_module(name)
+
+
+def warm_up(modules=HEAVY_MODULES):
+    """Import the given modules on a background thread, once per process."""
+    global _warm_up_thread
+    with _lock:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(
+            target=lambda: [timed_import(name) for name in modules],
+            name='disaster-hub-warm-up',
+            daemon=True,
+        )
+    _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def report():
+    with _lock:
+        return dict(_timings)
+
+
+def main():
+    total = 0.0
+    for name in APP_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(name)
+        seconds = time.perf_counter() - started
+        total += seconds
+        print(f"{name:32} {seconds * 1000:8.1f} ms")
+    print(f"{'total':32} {total * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Synthetic tables in the layout of data/Main.csv, at a multiple of its size.
+#
+# Every country of the template is split into `scale` units (standing in for sub-national
+# regions) named "<country> / <n>". Each unit gets one row per indicator its country
+# reports, so the table has `scale` times as many rows with the same mix of indicators.
+# The counts of a unit's row are drawn from a Poisson distribution around its country's
+# row: the rate of each year is halfway between that year's count and the row's mean, and
+# a gamma-distributed factor (mean 1) varies the level from unit to unit. Rows that are
+# mostly zeros in the template stay mostly zeros, busy rows stay busy, and years keep
+# their ups and downs. The TOTAL rows and the Total column are sums of the generated
+# counts, as in Main.csv.
+#
+#     python -m disaster_hub.synthetic --scale 100 [--seed 0] [--output PATH]
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from disaster_hub.cube import TOTAL
+
+SEPARATOR = ' / '
+# Shape of the gamma factor; smaller values spread the units further apart.
+LEVEL_SHAPE = 4.0
+
+
+def year_columns(frame):
+    return [column for column in frame.columns if column.isdigit()]
+
+
+def parent_country(units):
+    """Template country of each generated unit name."""
+    return pd.Series(units).str.split(SEPARATOR, n=1, regex=False).str[0].to_numpy()
+
+
+def generate(template, scale, seed=0):
+    """Table in the layout of template (Main.csv) with `scale` units per country."""
+    rng = np.random.default_rng(seed)
+    years = year_columns(template)
+    rows = template[template['Indicator'] != TOTAL].reset_index(drop=True)
+    counts = rows[years].fillna(0).to_numpy(dtype=np.float64)
+    rates = (counts + counts.mean(axis=1, keepdims=True)) / 2
+
+    # Unit-major order: all indicator rows of a unit follow each other, like Main.csv.
+    row_units = np.arange(scale).repeat(len(rows))
+    template_rows = np.tile(np.arange(len(rows)), scale)
+    levels = rng.gamma(LEVEL_SHAPE, 1 / LEVEL_SHAPE, size=len(template_rows))
+    values = rng.poisson(rates[template_rows] * levels[:, None]).astype(np.float64)
+
+    countries = rows['Country'].to_numpy(dtype=object)[template_rows]
+    units = countries if scale == 1 else countries + SEPARATOR + (row_units + 1).astype(str).astype(object)
+    frame = pd.DataFrame(values, columns=years)
+    frame.insert(0, 'Indicator', rows['Indicator'].to_numpy(dtype=object)[template_rows])
+    frame.insert(0, 'Country', units)
+
+    totals = frame.groupby('Country', sort=False)[years].sum().reset_index()
+    totals.insert(1, 'Indicator', TOTAL)
+    frame = pd.concat([frame, totals], ignore_index=True)
+    # The rows of each unit together, indicators (and TOTAL) in the order of the template.
+    order = {indicator: position for position, indicator in enumerate(template['Indicator'].unique())}
+    unit_order = {unit: position for position, unit in enumerate(pd.unique(frame['Country']))}
+    frame = frame.iloc[np.lexsort((frame['Indicator'].map(order).to_numpy(),
+                                   frame['Country'].map(unit_order).to_numpy()))].reset_index(drop=True)
+
+    frame.insert(0, 'ObjectId', np.arange(1, len(frame) + 1))
+    frame['Total'] = frame[years].sum(axis=1)
+    return frame[list(template.columns)]
+
+
+def main(argv=None):
+    from disaster_hub import loader
+
+    parser = argparse.ArgumentParser(description='Write a synthetic table in the layout of Main.csv.')
+    parser.add_argument('--scale', type=int, required=True, help='units per template country')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='CSV file to write (default: data/synthetic/Main_x<scale>.csv)')
+    args = parser.parse_args(argv)
+
+    output = args.output or loader.data_path(os.path.join('synthetic', f"Main_x{args.scale}.csv"))
+    frame = generate(loader.load_csv('Main.csv'), args.scale, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    frame.to_csv(output, index=False)
+    print(f"Wrote {len(frame)} rows to {output} ({os.path.getsize(output)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,68 @@
+import os
+import time
+
+_imports_started = time.perf_counter()
+
+import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
-import plotly.express as px
-import matplotlib.pyplot as plt
-from statsmodels.tsa.arima.model import ARIMA
 
-# This code provides a selection of interactive visualizations for examining data on global disasters using Altair and Plotly charts in a Streamlit interface. By selecting a nation, a year, or both, you can explore graphs that indicate the number and different kinds of disasters. The visualizations provide a simple, entertaining, and interactive way to understand the patterns and events of significant global disasters.
+from disaster_hub import (backtest, batch_forecast, chart_cache, compact, explorer, export, fast_forecast, forecast_jobs,
+                          forecasting, loader, maps, metrics, order_search, startup)
+from disaster_hub.cube import TOTAL
 
-def page_all_disasters():
+startup.record('app imports', time.perf_counter() - _imports_started)
 
-    df = pd.read_csv("./data/Main.csv")
-    countries = df['Country'].unique()
 
-    st.write(f"## Total disasters for a specific country")
+# Turns a labels x years matrix taken from the cube into the long layout Altair expects.
 
-    selected_country1 = st.selectbox("Select a country for chart 1", countries, key='chart1')
-    country_data = df[df['Country'] == selected_country1].drop('Total', axis=1)
-    melted_data = pd.melt(country_data, id_vars=['ObjectId', 'Country', 'Indicator'], var_name='Year', value_name='Total')
-    chart1 = alt.Chart(melted_data[melted_data['Indicator'] != 'TOTAL']).mark_bar().encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Total:Q', title='Total'),
-        color='Indicator:N',
-        tooltip=['Year', 'Total', 'Indicator']
-    ).properties(
-        width=800,
-        height=500,
-        title=f"Country - {selected_country1}"
-    )
-    st.altair_chart(chart1)
+def long_frame(labels, label_name, years, matrix, value_name):
+    return pd.DataFrame({
+        label_name: np.repeat(labels, len(years)),
+        'Year': np.tile(years, len(labels)),
+        value_name: np.asarray(matrix).ravel(),
+    })
+
+# Every Altair chart goes through the chart spec cache: the builders below are only called when the finished spec for that chart and selection is not cached yet, and the page renders the cached spec directly.
+
+def show_chart(key, build):
+    with metrics.span('chart'):
+        spec = chart_cache.spec(key, build)
+    with metrics.span('emit'):
+        st.vega_lite_chart(spec=spec)
+
+
+# Sections with widgets of their own run as Streamlit fragments: changing one of their widgets reruns (and resends) that section alone instead of the whole page. Everything a section needs besides its own widgets is passed in as arguments when the page runs, and the page-wide widgets (the year range, the dataset radio) stay outside, so changing them still reruns every section that depends on them. A fragment's rerun is recorded under the page it belongs to, and flushed on its own since main() does not run.
+
+@st.fragment
+def _section_fragment(page, name, render, args):
+    rerun = not metrics.current_page()
+    with metrics.page(page), metrics.section(name):
+        render(*args)
+    if rerun:
+        metrics.flush()
+
+
+def section_fragment(name, render, *args):
+    _section_fragment(metrics.current_page(), name, render, args)
+
+
+# The years a page covers, picked with a range slider that spans every year of the data. The charts below take the chosen first and last year and the cube turns them into a slice of the year axis, or into two prefix-sum lookups for totals.
+
+def year_range(years, key):
+    first, last = st.slider("Years", min_value=int(years[0]), max_value=int(years[-1]),
+                            value=(int(years[0]), int(years[-1])), key=key)
+    return str(first), str(last)
 
-    st.write(f"## Trend of total disasters for a specific country")
 
-    selected_country2 = st.selectbox("Select a country for chart 1", countries, key='chart2')
-    country_data = df[df['Country'] == selected_country2].drop('Total', axis=1)
-    melted_data = pd.melt(country_data, id_vars=['ObjectId', 'Country', 'Indicator'], var_name='Year', value_name='Total')
-    melted_data = melted_data[melted_data['Indicator'] != 'TOTAL']
-    chart2 = alt.Chart(melted_data).mark_line().encode(
+def country_breakdown_chart(cube, country, mark, first, last):
+    span = cube.year_slice(first, last)
+    indicators, counts = cube.country_breakdown(country)
+    melted_data = long_frame(indicators, 'Indicator', cube.years[span], counts[:, span], 'Total')
+    chart = alt.Chart(melted_data)
+    chart = chart.mark_bar() if mark == 'bar' else chart.mark_line()
+    return chart.encode(
         x=alt.X('Year:N', title='Year'),
         y=alt.Y('Total:Q', title='Total'),
         color='Indicator:N',
@@ -43,17 +70,14 @@ def page_all_disasters():
     ).properties(
         width=800,
         height=500,
-        title=f"Country -  {selected_country2}"
+        title=f"Country - {country}"
     )
-    st.altair_chart(chart2)
 
-    st.write(f"## Number of Disasters in a Selected Country Over the Last Two Decades")
 
-    df = pd.read_csv("./data/Main.csv")
-    countries = df['Country'].unique()
-    selected_country = st.selectbox("Select a country", countries, key='country_select')
-    country_data = df[df['Country'] == selected_country]
-    country_data = country_data[country_data['Indicator'] != 'TOTAL']
+def country_summary_chart(cube, country, first, last):
+    indicators, _ = cube.country_breakdown(country)
+    totals = [cube.range_total(indicator, first, last, country) for indicator in indicators]
+    country_data = pd.DataFrame({'Indicator': indicators, 'Total': totals})
     bar_chart = alt.Chart(country_data).mark_bar().encode(
         x=alt.X('Indicator:N', sort='-x'),
         y=alt.Y('Total:Q', axis=alt.Axis(title='Occurrences')),
@@ -70,269 +94,76 @@ def page_all_disasters():
         width=300,
         height=200,
     )
-    st.write('')
-    st.write('')
-    st.write('')
-    st.write('')
-    st.write(alt.hconcat(bar_chart, pie_chart))
+    return alt.hconcat(bar_chart, pie_chart)
 
-    df = pd.read_csv("./data/Main.csv")
-    years = [str(year) for year in range(2001, 2022)]
 
-    st.write(f"## Distribution of types of disasters across all countries for a specific year")
-
-    selected_year = st.selectbox("Select a year", years)
-    year_data = df[['Country', 'Indicator', selected_year]]
-    grouped_data = year_data.groupby('Indicator').sum().reset_index()
-    grouped_data = grouped_data[grouped_data['Indicator'] != 'TOTAL']
-    chart = alt.Chart(grouped_data).mark_arc().encode(
-        theta=selected_year,
+def year_distribution_chart(cube, rollups, year):
+    grouped_data = pd.DataFrame({'Indicator': cube.disaster_types, year: rollups.year_distribution(year, cube.disaster_types)})
+    return alt.Chart(grouped_data).mark_arc().encode(
+        theta=year,
         color='Indicator:N',
-        tooltip=['Indicator', selected_year]
+        tooltip=['Indicator', year]
     ).properties(
         width=700,
         height=400,
-        title=f"Distribution of types of disasters across all countries in {selected_year}"
+        title=f"Distribution of types of disasters across all countries in {year}"
     )
-    st.altair_chart(chart)
-    total = year_data[selected_year].sum()
-    st.write(f"Total occurrences of all types of disasters in all countries in {selected_year}: {total}")
-    
-    total_data = df[df['Indicator'] == 'TOTAL'].reset_index()
-    st.write(f"## Total occurrences of disasters by country")
-    map_data = total_data.groupby('Country')['Total'].sum().reset_index()
-    fig = px.choropleth(map_data, locations='Country', locationmode='country names',
-                        color='Total', range_color=(0, map_data['Total'].max()),
-                        width=800, height=600)
-    st.plotly_chart(fig)
-    
-    df_original = pd.read_csv("./data/Original.csv")
-
-    df_cleaned = pd.read_csv("./data/Main.csv")
-
-    selected_dataset = st.radio("Select dataset", ("Original", "Cleaned"))
-    if selected_dataset == "Original":
-        st.write("# Original Dataset")
-        st.write(df_original)
-    else:
-        st.write("# Cleaned Dataset")
-        st.write(df_cleaned)
-
-    
-# This code implements an ARIMA model to forecast the probability of natural disasters in a certain country and disaster type over the next five years. The user selects the country and type of disaster from a menu before clicking a button to generate the forecast. The forecasts are displayed using an Altair line chart.
-
-
-def prediction():
-  
-    def fit_and_forecast_arima(data, country, indicator):
-        filtered_data = data[(data['Country'] == country) & (data['Indicator'] == indicator)]
-        filtered_data = filtered_data[years].T
-        filtered_data.index = pd.to_datetime(filtered_data.index, format='%Y')
-
-        try:
-            arima_model = ARIMA(filtered_data, order=(1, 1, 1))
-            arima_results = arima_model.fit()
-            forecast_arima = arima_results.forecast(steps=5)
-        except ValueError:
-            forecast_arima = pd.Series([0] * 5, index=pd.date_range(start=filtered_data.index[-1] + pd.DateOffset(years=1), periods=5, freq='AS'))
-
-        return forecast_arima
-
-    data = pd.read_csv('./data/Main.csv')
-    years = [str(x) for x in range(2001, 2022)]
-
-    st.title('Natural Disaster Prediction')
-    st.write('Select a country and disaster type to forecast occurrences in the next 5 years.')
-
-    countries = data['Country'].unique().tolist()
-    disasters = data[data['Indicator'] != 'TOTAL']['Indicator'].unique().tolist()
-    selected_country = st.selectbox('Country:', countries, index=countries.index('United States'))
-    selected_disaster = st.selectbox('Disaster Type:', disasters, index=disasters.index('Storm'))
-
-    if st.button('Get Prediction'):
-        forecast_arima = fit_and_forecast_arima(data, selected_country, selected_disaster)
-
-        st.subheader(f'ARIMA Predictions for {selected_country} - {selected_disaster}')
-        chart_data = pd.DataFrame({
-            'Year': forecast_arima.index.year,
-            'Predictions': forecast_arima.values
-        })
-
-        chart = alt.Chart(chart_data).mark_line().encode(
-            alt.X('Year:O', axis=alt.Axis(title='Year')),
-            alt.Y('Predictions:Q', axis=alt.Axis(title='Predictions'))
-        )
-
-        st.altair_chart(chart, use_container_width=True)
 
-        
-# This code enables interactive exploration of drought data, such as the frequency and number of droughts by country and year. Users can explore various charts including a choropleth map, a bubble chart, and a pie chart by selecting countries from a dropdown menu in addition to viewing a bar chart showing frequency through time. These visualizations offer a simple means to understand patterns and trends in drought data.
-
-def page_second():
-
-    df = pd.read_csv("./data/Drought.csv")
-    
-    countries = df['Country'].unique()
-    
-    st.write("# Drought Frequency by Country")
-
-    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
-
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Drought Frequency')
 
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Drought']).mark_bar().encode(
+def frequency_chart(cube, indicator, name, countries, first, last):
+    frequency = f"{name} Frequency"
+    span = cube.year_slice(first, last)
+    melted_data = long_frame(countries, 'Country', cube.years[span], cube.series_for(countries, indicator)[:, span],
+                             frequency)
+    return alt.Chart(melted_data).mark_bar().encode(
         x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Drought Frequency:Q', title='Drought Frequency'),
+        y=alt.Y(f'{frequency}:Q', title=frequency),
         color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
     ).properties(
         width=800,
         height=500,
-        title="Drought Frequency by Country"
+        title=f"{name} Frequency by Country"
     )
 
-    st.altair_chart(chart)
-    
-    ###############################################################
-    
-    st.write(f"### Geographical Distribution of Drought Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                    locations='Country',
-                    locationmode='country names',
-                    color='Total',
-                    scope='world')
-
-    st.plotly_chart(fig)
-
-    ###############################################################
-
-    st.write(f"## Drought Count by Year for a Specific Country")
-
-    selected_country = st.selectbox("Select a Country", countries, key='chart2')
-
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Drought_Count')
 
-    chart2 = alt.Chart(melted_data).mark_bar(color='brown').encode(
+def country_count_chart(cube, indicator, name, color, country, first, last):
+    count = f"{name.replace(' ', '_')}_Count"
+    span = cube.year_slice(first, last)
+    melted_data = pd.DataFrame({'Year': cube.years[span], count: cube.series(country, indicator)[span]})
+    return alt.Chart(melted_data).mark_bar(color=color).encode(
         x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Drought_Count:Q', title='Drought Count'),
-        tooltip=['Year', 'Drought_Count']
+        y=alt.Y(f'{count}:Q', title=f'{name} Count'),
+        tooltip=['Year', count]
     ).properties(
         width=600,
         height=500,
-        title=f"Country selected - {selected_country}"
+        title=f"Country selected - {country}"
     )
 
-    st.altair_chart(chart2)
-    
-    ###############################################################
-
-    drought_data = df[df['Indicator'] == 'Drought'].groupby(['Country']).sum().reset_index()
-
-    chart = alt.Chart(drought_data).mark_circle().encode(
-        x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Droughts'),
-        color=alt.Color('Country:N', legend=None),
-        size=alt.Size('Total:Q', legend=None),
-        tooltip=['Country', 'Total']
-    ).properties(
-        width=700,
-        height=500
-    ).interactive()
-    
-    st.write(f"### Proportion of Total Number of Droughts by Country")
-
-    st.altair_chart(chart)
-    
-    ###############################################################
-
-    data = pd.read_csv('./data/Drought.csv')
-
-    total_occurrences = data["Total"].sum()
-
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
-
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
-
-    st.write(f"### Contribution of Each Year's Drought Occurrences to the Total Number of Droughts")
-
-    fig = px.pie(df, values="Percentage", names="Year")
 
-    st.plotly_chart(fig)
-    
-    
-# This code provides several interactive visualizations for examining data on extreme temperatures, such as the frequency and count of extreme temperatures by country and year. Users can select a country from a dropdown menu to view a bar chart that shows frequency over time. They can also explore other charts, such as a pie chart, a choropleth map, and bubble charts. These illustrations make it simple to comprehend the patterns and trends in the data on extreme temperatures.
-
-    
-def page_third():
-    
-    df = pd.read_csv("./data/Extreme_temperature.csv")
-
-    countries = df['Country'].unique()
-
-    st.write("# Extreme Temperature Frequency by Country")
-
-    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
-
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Frequency')
-
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Extreme temperature']).mark_bar().encode(
+def group_frequency_chart(rollups, indicator, name, level, groups, first, last):
+    frequency = f"{name} Frequency"
+    span = rollups.year_slice(first, last)
+    melted_data = long_frame(groups, level, rollups.years[span],
+                             rollups.group_series_for(level, groups, indicator)[:, span], frequency)
+    return alt.Chart(melted_data).mark_line(point=True).encode(
         x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Frequency:Q', title='Frequency'),
-        color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
+        y=alt.Y(f'{frequency}:Q', title=frequency),
+        color=alt.Color(f'{level}:N', legend=alt.Legend(title=level)),
+        tooltip=['Year', level, frequency]
     ).properties(
         width=800,
-        height=500,
-        title="Extreme Temperature Frequency by Country"
-    )
-
-    st.altair_chart(chart)
-
-    ###############################################################
-    
-    st.write(f"### Geographical Distribution of Extreme Temperature Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                    locations='Country',
-                    locationmode='country names',
-                    color='Total',
-                    scope='world')
-
-    st.plotly_chart(fig)
-
-    ###############################################################
-
-    st.write(f"## Extreme Temperature Count by Year for a Specific Country")
-
-    selected_country = st.selectbox("Select a Country", countries, key='chart2')
-
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Count')
-
-    chart2 = alt.Chart(melted_data).mark_bar(color='red').encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Count:Q', title='Count'),
-        tooltip=['Year', 'Count']
-    ).properties(
-        width=600,
-        height=500,
-        title=f"Country selected - {selected_country}"
+        height=400,
+        title=f"{name} Frequency by {level}"
     )
 
-    st.altair_chart(chart2)
-
-    ###############################################################
-
-    temperature_data = df[df['Indicator'] == 'Extreme temperature'].groupby(['Country']).sum().reset_index()
 
-    chart = alt.Chart(temperature_data).mark_circle().encode(
+def totals_bubble_chart(cube, indicator, plural, first, last):
+    total_countries, totals = cube.range_totals(indicator, first, last)
+    total_data = pd.DataFrame({'Country': total_countries, 'Total': totals})
+    return alt.Chart(total_data).mark_circle().encode(
         x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Extreme Temperatures'),
+        y=alt.Y('Total:Q', title=f'Total Number of {plural}'),
         color=alt.Color('Country:N', legend=None),
         size=alt.Size('Total:Q', legend=None),
         tooltip=['Country', 'Total']
@@ -341,424 +172,461 @@ def page_third():
         height=500
     ).interactive()
 
-    st.write(f"### Proportion of Total Number of Extreme Temperatures by Country")
-
-    st.altair_chart(chart)
 
-    ###############################################################
-
-    data = pd.read_csv('./data/Extreme_temperature.csv')
-
-    total_occurrences = data["Total"].sum()
-
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
+# This code provides a selection of interactive visualizations for examining data on global disasters using Altair and Plotly charts in a Streamlit interface. By selecting a nation, a year, or both, you can explore graphs that indicate the number and different kinds of disasters. The visualizations provide a simple, entertaining, and interactive way to understand the patterns and events of significant global disasters.
 
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
+# Builds the charts of the countries listed in DISASTER_HUB_PREWARM_COUNTRIES (separated by semicolons, since some country names contain commas) in the background, so the first visitor to look at one of them already gets cached charts.
+
+def prewarm_charts():
+    cube = loader.load_cube()
+    known = set(cube.countries)
+    countries = [country for country in os.environ.get('DISASTER_HUB_PREWARM_COUNTRIES', '').split(';') if country in known]
+    # The pages open on the whole range of years.
+    first, last = cube.years[0], cube.years[-1]
+    builders = []
+    for country in countries:
+        builders.append((('breakdown', 'bar', country, first, last),
+                         lambda country=country: country_breakdown_chart(cube, country, 'bar', first, last)))
+        builders.append((('breakdown', 'line', country, first, last),
+                         lambda country=country: country_breakdown_chart(cube, country, 'line', first, last)))
+        builders.append((('summary', country, first, last), lambda country=country: country_summary_chart(cube, country, first, last)))
+        for indicator, (name, plural, color) in DISASTER_PAGES.items():
+            if cube.present[cube.country_code(country), cube.indicator_code(indicator)]:
+                builders.append((('country_count', indicator, country, first, last),
+                                 lambda country=country, indicator=indicator, name=name, color=color:
+                                 country_count_chart(cube, indicator, name, color, country, first, last)))
+    for indicator, (name, plural, color) in DISASTER_PAGES.items():
+        builders.append((('totals_bubble', indicator, first, last),
+                         lambda indicator=indicator, plural=plural: totals_bubble_chart(cube, indicator, plural, first, last)))
+    if countries:
+        chart_cache.prewarm('charts', builders)
 
-    st.write(f"### Contribution of Each Year's Extreme Temperature Occurrences to the Total Number of Extreme Temperatures")
 
-    fig = px.pie(df, values="Percentage", names="Year")
+def page_all_disasters():
 
-    st.plotly_chart(fig)
+    with metrics.section('data'), metrics.span('load'):
+        cube = loader.load_cube()
+        rollups = loader.load_rollups()
+        countries = cube.countries
+        years = cube.years
+
+    with metrics.section('year range'):
+        first, last = year_range(years, 'all_year_range')
+
+    section_fragment('breakdown bar', breakdown_section, cube, countries, 'bar', 'chart1',
+                     "## Total disasters for a specific country", first, last)
+    section_fragment('breakdown line', breakdown_section, cube, countries, 'line', 'chart2',
+                     "## Trend of total disasters for a specific country", first, last)
+    section_fragment('country summary', country_summary_section, cube, countries, first, last)
+    section_fragment('year distribution', year_distribution_section, cube, rollups, years[cube.year_slice(first, last)])
+
+    with metrics.section('choropleth'):
+        st.write(f"## Total occurrences of disasters by country")
+        with metrics.span('chart'):
+            fig = maps.choropleth(TOTAL, width=800, height=600, zero_based=True, first=first, last=last)
+        with metrics.span('emit'):
+            st.plotly_chart(fig)
     
-
-# The "page_fourth" function in this application loads and shows flood statistics broken down by country. Interactive visualizations, such as bar charts and choropleth maps, created using Plotly and Altair, such as the frequency and number of floods in various countries. A pie chart that shows the percentage contribution of each year to the total frequency of the flood indicator occurrences is another element of the function.
+    section_fragment('dataset', dataset_section)
+    section_fragment('export', export_section, cube)
 
 
-def page_fourth():
-    
-    df = pd.read_csv("./data/Flood.csv")
+def breakdown_section(cube, countries, mark, key, heading, first, last):
+    st.write(heading)
 
-    countries = df['Country'].unique()
+    selected_country = st.selectbox("Select a country for chart 1", countries, key=key)
+    show_chart(('breakdown', mark, selected_country, first, last),
+               lambda: country_breakdown_chart(cube, selected_country, mark, first, last))
 
-    st.write("# Flood Frequency by Country")
 
-    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
+def country_summary_section(cube, countries, first, last):
+    st.write(f"## Number of Disasters in a Selected Country from {first} to {last}")
 
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
+    selected_country = st.selectbox("Select a country", countries, key='country_select')
+    st.write('')
+    st.write('')
+    st.write('')
+    st.write('')
+    show_chart(('summary', selected_country, first, last), lambda: country_summary_chart(cube, selected_country, first, last))
 
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Flood Frequency')
 
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Flood']).mark_bar().encode(
-        x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Flood Frequency:Q', title='Flood Frequency'),
-        color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
-    ).properties(
-        width=800,
-        height=500,
-        title="Flood Frequency by Country"
-    )
+def year_distribution_section(cube, rollups, years):
+    st.write(f"## Distribution of types of disasters across all countries for a specific year")
 
-    st.altair_chart(chart)
+    selected_year = st.selectbox("Select a year", years)
+    show_chart(('year_distribution', selected_year), lambda: year_distribution_chart(cube, rollups, selected_year))
+    with metrics.span('transform'):
+        total = rollups.year_distribution(selected_year, cube.disaster_types).sum()
+    st.write(f"Total occurrences of all types of disasters in all countries in {selected_year}: {total}")
 
-    ###############################################################
 
-    st.write(f"### Geographical Distribution of Flood Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                        locations='Country',
-                        locationmode='country names',
-                        color='Total',
-                        scope='world')
+def dataset_section():
+    selected_dataset = st.radio("Select dataset", ("Original", "Cleaned"))
+    if selected_dataset == "Original":
+        st.write("# Original Dataset")
+        with metrics.span('load'):
+            df = loader.load_source()
+        dataset_viewer(df, 'original')
+    else:
+        st.write("# Cleaned Dataset")
+        with metrics.span('load'):
+            df = loader.load_table()
+        dataset_viewer(df, 'cleaned')
 
-    st.plotly_chart(fig)
 
-    ###############################################################
+# Shows one page of a dataset at a time. Filtering, sorting and paging happen on the server and only the visible rows and the chosen columns are sent to the browser.
 
-    st.write(f"## Flood Count by Year for a Specific Country")
+def dataset_viewer(df, key):
 
-    selected_country = st.selectbox("Select a Country", countries, key='chart2')
+    columns = st.multiselect("Columns", list(df.columns), default=explorer.default_columns(df), key=f'{key}_columns')
+    countries = st.multiselect("Filter countries", df['Country'].unique().tolist(), key=f'{key}_countries')
+    indicators = st.multiselect("Filter indicators", df['Indicator'].unique().tolist(), key=f'{key}_indicators')
+    sort_by = st.selectbox("Sort by", ['Source order'] + list(df.columns), key=f'{key}_sort')
+    ascending = st.checkbox("Ascending", value=True, key=f'{key}_ascending')
+    page_size = st.selectbox("Rows per page", (25, 50, 100), key=f'{key}_page_size')
 
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
+    with metrics.span('transform'):
+        positions = explorer.select_rows(df, {'Country': countries, 'Indicator': indicators},
+                                         None if sort_by == 'Source order' else sort_by, ascending)
+    pages = explorer.page_count(len(positions), page_size)
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f'{key}_page')
 
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Flood_Count')
+    with metrics.span('emit'):
+        st.dataframe(compact.plain_frame(explorer.window(df, positions, columns, page, page_size)))
+    first = (page - 1) * page_size
+    st.caption(f"Rows {min(first + 1, len(positions))}-{min(first + page_size, len(positions))} of {len(positions)}")
 
-    chart2 = alt.Chart(melted_data).mark_bar(color='blue').encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Flood_Count:Q', title='Flood Count'),
-        tooltip=['Year', 'Flood_Count']
-    ).properties(
-        width=600,
-        height=500,
-        title=f"Country selected - {selected_country}"
-    )
 
-    st.altair_chart(chart2)
+# Lets analysts download a filtered extract of the original dataset: a set of countries, a set of disaster types and a range of years, as CSV or Parquet. The file is only produced when the download button is clicked, by streaming the source through disaster_hub.export in chunks.
 
-    ###############################################################
+def export_section(cube):
 
-    flood_data = df[df['Indicator'] == 'Flood'].groupby(['Country']).sum().reset_index()
+    st.write("## Export data")
+    export_years = loader.get_or_build(('export_years',), [loader.data_path('Original.csv')], export.available_years)
+    countries = st.multiselect("Countries to export (all when empty)", cube.countries, key='export_countries')
+    indicators = st.multiselect("Disaster types to export (all when empty)", cube.indicators, key='export_indicators')
+    year_from, year_to = st.slider("Years to export", min_value=export_years[0], max_value=export_years[-1],
+                                   value=(export_years[0], export_years[-1]), key='export_years')
+    fmt = st.radio("Format", tuple(export.FORMATS), horizontal=True, key='export_format')
+    extension, mime = export.FORMATS[fmt]
 
-    chart = alt.Chart(flood_data).mark_circle().encode(
-        x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Floods'),
-        color=alt.Color('Country:N', legend=None),
-        size=alt.Size('Total:Q', legend=None),
-        tooltip=['Country', 'Total']
-    ).properties(
-        width=700,
-        height=500
-    ).interactive()
+    st.download_button(
+        f"Download {fmt}",
+        data=lambda: b''.join(export.iter_export(fmt, countries=countries, indicators=indicators,
+                                                 year_from=year_from, year_to=year_to)),
+        file_name=f"disasters_{year_from}_{year_to}.{extension}",
+        mime=mime,
+    )
 
-    st.write(f"### Proportion of Total Number of Floods by Country")
 
-    st.altair_chart(chart)
+# This code implements an ARIMA model to forecast the probability of natural disasters in a certain country and disaster type over the next five years. The user selects the country and type of disaster from a menu before clicking a button to generate the forecast. The forecasts are displayed using an Altair line chart. The vectorized engines in disaster_hub.fast_forecast can be picked instead of ARIMA, and a table compares the accuracy and throughput of every engine on the last five years of data.
 
-    ###############################################################
 
-    data = pd.read_csv('./data/Flood.csv')
+def prediction():
 
-    total_occurrences = data["Total"].sum()
+    with metrics.section('data'), metrics.span('load'):
+        cube = loader.load_cube()
 
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
+    st.title('Natural Disaster Prediction')
+    st.write('Select a country and disaster type to forecast occurrences in the next 5 years.')
 
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
+    countries = cube.countries.tolist()
+    disasters = cube.disaster_types
+    selected_country = st.selectbox('Country:', countries, index=countries.index('United States'))
+    selected_disaster = st.selectbox('Disaster Type:', disasters, index=disasters.index('Storm'))
 
-    st.write(f"### Contribution of Each Year's Flood Occurrences to the Total Number of Floods")
+    engine = st.selectbox('Forecasting engine:', ['ARIMA', 'Auto ARIMA'] + list(fast_forecast.ENGINES))
 
-    fig = px.pie(df, values="Percentage", names="Year")
+    # The request is kept in the session so the reruns that poll a background fit still show it; it is only shown while the selection it was made for is. Its outcome is kept as well, so the forecast is looked up once per click rather than on every rerun, and the forecast cache counts each fit it saves once.
+    request = (selected_country, selected_disaster, engine)
+    if st.button('Get Prediction'):
+        st.session_state['prediction_request'] = request
+        st.session_state.pop('prediction_outcome', None)
+
+    if st.session_state.get('prediction_request') == request:
+        with metrics.section('forecast'):
+            show_prediction(cube, *request)
+
+    with metrics.section('engine comparison'):
+        st.write(f"### Engine comparison")
+        st.write(f"Each engine forecasts the last {forecasting.HORIZON} years of every series from the years before them.")
+        with metrics.span('load'):
+            report = list(fast_forecast.load_evaluation())
+            stored = batch_forecast.load_stored()
+        if stored is not None and stored.manifest.get('evaluation'):
+            report.insert(0, stored.manifest['evaluation'])
+        else:
+            st.caption('Run `python -m disaster_hub.batch_forecast` to include ARIMA in the comparison.')
+        with metrics.span('emit'):
+            st.dataframe(pd.DataFrame(report).rename(columns={
+                'engine': 'Engine', 'series': 'Series', 'seconds': 'Seconds',
+                'series_per_second': 'Series per second', 'mae': 'MAE', 'rmse': 'RMSE',
+            }))
+
+        st.write(f"### Backtests")
+        with metrics.span('load'):
+            runs = backtest.load_backtests()
+        if runs:
+            st.write('Rolling-origin error over every training end year and horizon of the saved backtest runs.')
+            with metrics.span('emit'):
+                st.dataframe(backtest.summary(runs))
+        else:
+            st.caption('Run `python -m disaster_hub.backtest` to compare the engines over several training windows.')
+
+
+# Forecast of one series with the chosen engine, as (a note on how it was obtained, years, values), or the disaster_hub.forecast_jobs job computing it when a model still has to be fitted. Stored and cached forecasts are returned right away; fits run in the background so the rerun does not wait for them, and requests for the same series from several sessions share one job. Auto ARIMA picks the order of each series by AIC with disaster_hub.order_search, reusing the orders stored by `python -m disaster_hub.order_search` or searched earlier in this process.
+
+def predict(cube, country, disaster, engine):
+    span = forecasting.training_span(cube.years)
+    years = cube.years[span]
+    forecast_years = forecasting.forecast_years(years)
+    if engine == 'Auto ARIMA':
+        values = cube.series(country, disaster)[span]
+        found = order_search.known_order(country, disaster, values)
+        entry = forecasting.forecast_cache.get(forecasting.forecast_key(values, found[0])) if found else None
+        if entry is not None:
+            return auto_arima_note(found, entry[1]), forecast_years, entry[0]
+        return forecast_jobs.submit(('Auto ARIMA', order_search.order_key(values, 'aic')),
+                                    lambda job: auto_arima_task(job, country, disaster, values, years),
+                                    f'{country} - {disaster}')
+    if engine == 'ARIMA':
+        # Forecasts precomputed by `python -m disaster_hub.batch_forecast` are served as they
+        # are; the model is only fitted when there is no current stored forecast.
+        stored = batch_forecast.load_stored()
+        found = stored.lookup(country, disaster) if stored is not None else None
+        if found is not None:
+            return 'Precomputed forecast', found[0], found[1]
+        values = cube.series(country, disaster)[span]
+        key = forecasting.forecast_key(values)
+        entry = forecasting.forecast_cache.get(key)
+        if entry is not None:
+            return 'Forecast fitted on demand', forecast_years, entry[0]
+        return forecast_jobs.submit(('ARIMA', key), lambda job: arima_task(job, key, values, years),
+                                    f'{country} - {disaster}')
+    forecasts = fast_forecast.load_forecast_cube(engine)
+    return '', forecast_years, forecasts[cube.country_code(country), cube.indicator_code(disaster)]
+
+
+def arima_task(job, key, values, years):
+    job.update(f'Fitting ARIMA{forecasting.ORDER}', 0.1)
+    entry = forecasting.fit_and_forecast_arima(values, years)
+    forecasting.forecast_cache.put(key, entry)
+    return 'Forecast fitted on demand', forecasting.forecast_years(years), entry[0]
+
+
+def auto_arima_task(job, country, disaster, values, years):
+    def searched(number, rounds):
+        job.update(f'Choosing the order: round {number + 1} of {rounds}', 0.8 * number / rounds)
+
+    job.update('Choosing the order', 0.05)
+    found = order_search.order_for(country, disaster, values, years, progress=searched)
+    job.update(f'Fitting ARIMA{found[0]}', 0.8)
+    forecast_values, diagnostics = forecasting.fit_and_forecast_arima(values, years, found[0])
+    forecasting.forecast_cache.put(forecasting.forecast_key(values, found[0]), (forecast_values, diagnostics))
+    return auto_arima_note(found, diagnostics), forecasting.forecast_years(years), forecast_values
+
+
+def auto_arima_note(found, diagnostics):
+    order, source = found
+    return f"ARIMA{order} chosen by AIC ({source}), AIC {diagnostics['aic']:.1f}"
+
+
+# Shows the forecast of one series, or the progress of the background job computing it. While the job runs, a fragment polls it every POLL_SECONDS without rerunning the rest of the page, and reruns the page once the job is done so the chart replaces the progress bar.
+
+POLL_SECONDS = 0.5
+
+
+def show_prediction(cube, country, disaster, engine):
+    outcome = st.session_state.get('prediction_outcome')
+    if outcome is None:
+        with metrics.span('transform'):
+            try:
+                outcome = predict(cube, country, disaster, engine)
+            except forecast_jobs.QueueFull:
+                st.warning('The server is busy with other forecasts, please try again in a moment.')
+                return
+        st.session_state['prediction_outcome'] = outcome
+
+    if isinstance(outcome, forecast_jobs.Job):
+        if not outcome.done:
+            st.fragment(lambda: job_progress(outcome), run_every=POLL_SECONDS)()
+            return
+        if outcome.state == forecast_jobs.FAILED:
+            st.error(f'The forecast failed: {outcome.error}')
+            return
+        outcome = outcome.result
+        st.session_state['prediction_outcome'] = outcome
+    note, forecast_years, forecast_values = outcome
+
+    st.subheader(f'{engine} Predictions for {country} - {disaster}')
+    with metrics.span('chart'):
+        chart_data = pd.DataFrame({
+            'Year': forecast_years,
+            'Predictions': forecast_values
+        })
 
-    st.plotly_chart(fig)
-    
+        chart = alt.Chart(chart_data).mark_line().encode(
+            alt.X('Year:O', axis=alt.Axis(title='Year')),
+            alt.Y('Predictions:Q', axis=alt.Axis(title='Predictions'))
+        )
 
-# The fifth page of this website application examines natural disasters. A choropleth map is used to display how frequently landslides occur in different countries and years, and the computer analyzes data on landslides to produce these maps. It also shows the total number of landslides by nation and the proportion that each year adds to the overall total using pie charts.
+    with metrics.span('emit'):
+        st.altair_chart(chart, use_container_width=True)
+    if note:
+        st.caption(note)
+    if engine in ('ARIMA', 'Auto ARIMA'):
+        stats = forecasting.forecast_cache.stats()
+        st.caption(f"Forecast cache: {stats['hits']} hits, {stats['misses']} misses, "
+                   f"{stats['seconds_saved']:.2f}s of fitting saved")
+
+
+def job_progress(job):
+    if job.done:
+        st.rerun()
+    if job.state == forecast_jobs.QUEUED:
+        text = f'{job.status} ({forecast_jobs.queue_position(job)} forecasts ahead)'
+    else:
+        text = f'{job.status} ({job.elapsed():.1f}s)'
+    st.progress(job.progress, text=f'Forecasting {job.label}: {text}')
+    stats = forecast_jobs.stats()
+    st.caption(f"Forecast jobs: {stats['running']} running, {stats['queued']} waiting, {stats['workers']} workers")
 
-    
-def page_fifth():
-    
-    df = pd.read_csv("./data/Landslide.csv")
 
-    countries = df['Country'].unique()
+# The disaster analysis pages below all show the same set of charts for a single disaster type: the frequency per year for a few selected countries, the same for the regions or subregions of the world, a choropleth map of the total occurrences, the counts per year for one country, a bubble chart of the total per country and the share of each year in the total. The per-country series come straight from the shared cube and the totals and shares from the rollup tables computed at ingest, so a rerun only looks up numbers that are already in memory.
 
-    st.write("# Landslide Frequency by Country")
+DISASTER_PAGES = {
+    'Drought': ('Drought', 'Droughts', 'brown'),
+    'Extreme temperature': ('Extreme Temperature', 'Extreme Temperatures', 'red'),
+    'Flood': ('Flood', 'Floods', 'blue'),
+    'Landslide': ('Landslide', 'Landslides', 'yellow'),
+    'Storm': ('Storm', 'Storms', 'purple'),
+    'Wildfire': ('Wildfire', 'Wildfires', 'orange'),
+}
 
-    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
 
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
+def disaster_page(indicator):
 
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Landslide Frequency')
+    name, plural, color = DISASTER_PAGES[indicator]
+    with metrics.section('data'), metrics.span('load'):
+        px = startup.timed_import('plotly.express')
+        cube = loader.load_cube()
+        rollups = loader.load_rollups()
+        countries = cube.countries_for(indicator)
+        years = cube.years
 
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Landslide']).mark_bar().encode(
-        x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Landslide Frequency:Q', title='Landslide Frequency'),
-        color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
-    ).properties(
-        width=800,
-        height=500,
-        title="Landslide Frequency by Country"
-    )
+    with metrics.section('year range'):
+        first, last = year_range(years, 'year_range')
+        with metrics.span('transform'):
+            total = cube.range_total(indicator, first, last)
+        st.write(f"{total} {plural.lower()} were recorded worldwide from {first} to {last}.")
 
-    st.altair_chart(chart)
+    section_fragment('frequency', frequency_section, cube, indicator, name, countries, first, last)
 
     ###############################################################
 
-    st.write(f"### Geographical Distribution of Landslide Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                    locations='Country',
-                    locationmode='country names',
-                    color='Total',
-                    scope='world')
-
-    st.plotly_chart(fig)
+    section_fragment('regions', regions_section, rollups, indicator, name, first, last)
 
     ###############################################################
 
-    st.write(f"## Landslide Count by Year for a Specific Country")
-
-    selected_country = st.selectbox("Select a Country", countries, key='chart2')
-
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Landslide_Count')
-
-    chart2 = alt.Chart(melted_data).mark_bar(color='yellow').encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Landslide_Count:Q', title='Landslide Count'),
-        tooltip=['Year', 'Landslide_Count']
-    ).properties(
-        width=600,
-        height=500,
-        title=f"Country selected - {selected_country}"
-    )
-
-    st.altair_chart(chart2)
+    with metrics.section('choropleth'):
+        st.write(f"### Geographical Distribution of {name} Occurrences Among Various Countries")
+        with metrics.span('chart'):
+            fig = maps.choropleth(indicator, first=first, last=last)
+        with metrics.span('emit'):
+            st.plotly_chart(fig)
 
     ###############################################################
 
-    landslide_data = df[df['Indicator'] == 'Landslide'].groupby(['Country']).sum().reset_index()
-
-    chart = alt.Chart(landslide_data).mark_circle().encode(
-        x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Landslides'),
-        color=alt.Color('Country:N', legend=None),
-        size=alt.Size('Total:Q', legend=None),
-        tooltip=['Country', 'Total']
-    ).properties(
-        width=700,
-        height=500
-    ).interactive()
-
-    st.write(f"### Proportion of Total Number of Landslides by Country")
-
-    st.altair_chart(chart)
+    section_fragment('country count', country_count_section, cube, indicator, name, color, countries, first, last)
 
     ###############################################################
 
-    data = pd.read_csv('./data/Landslide.csv')
-
-    total_occurrences = data["Total"].sum()
+    with metrics.section('bubble'):
+        st.write(f"### Proportion of Total Number of {plural} by Country")
 
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
+        show_chart(('totals_bubble', indicator, first, last), lambda: totals_bubble_chart(cube, indicator, plural, first, last))
 
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
-
-    st.write(f"### Contribution of Each Year's Landslide Occurrences to the Total Number of Landslides")
-
-    fig = px.pie(df, values="Percentage", names="Year")
-
-    st.plotly_chart(fig)
+    ###############################################################
 
-    
-# The page_sixth function pulls data on storm frequency by country from a CSV file and displays it in several charts. Users may browse statistics on storm frequency and count by year while choosing one or more nations. Along with a choropleth map showing the locations of the storms, the function also includes a chart showing the percentage of total storms per country.
+    with metrics.section('year shares'):
+        with metrics.span('transform'):
+            span = cube.year_slice(first, last)
+            df = pd.DataFrame({"Year": years[span], "Percentage": rollups.year_totals(indicator)[span] / max(total, 1) * 100})
 
-    
-def page_sixth():
+        st.write(f"### Contribution of Each Year's {name} Occurrences to the Total Number of {plural}")
 
+        with metrics.span('chart'):
+            fig = px.pie(df, values="Percentage", names="Year")
 
-    df = pd.read_csv("./data/Storm.csv")
+        with metrics.span('emit'):
+            st.plotly_chart(fig)
 
-    countries = df['Country'].unique()
 
-    st.write("# Storm Frequency by Country")
+def frequency_section(cube, indicator, name, countries, first, last):
+    st.write(f"# {name} Frequency by Country")
 
     selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
 
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
+    show_chart(('frequency', indicator, tuple(selected_countries), first, last),
+               lambda: frequency_chart(cube, indicator, name, selected_countries, first, last))
 
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Storm Frequency')
 
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Storm']).mark_bar().encode(
-        x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Storm Frequency:Q', title='Storm Frequency'),
-        color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
-    ).properties(
-        width=800,
-        height=500,
-        title="Storm Frequency by Country"
-    )
+def regions_section(rollups, indicator, name, first, last):
+    st.write(f"### {name} Frequency by Region")
 
-    st.altair_chart(chart)
+    level = st.radio("Group countries by", ('Region', 'Subregion'), horizontal=True, key='group_level')
+    groups = rollups.groups(level)
+    selected_groups = st.multiselect(f"Select {level.lower()}s", groups,
+                                     default=groups if level == 'Region' else [], key=f'groups_{level}')
 
-    ###############################################################
+    if selected_groups:
+        show_chart(('group_frequency', loader.regions_version(), indicator, level, tuple(selected_groups), first, last),
+                   lambda: group_frequency_chart(rollups, indicator, name, level, selected_groups, first, last))
 
-    st.write(f"### Geographical Distribution of Storm Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                    locations='Country',
-                    locationmode='country names',
-                    color='Total',
-                    scope='world')
 
-    st.plotly_chart(fig)
-
-    ###############################################################
-
-    st.write(f"## Storm Count by Year for a Specific Country")
+def country_count_section(cube, indicator, name, color, countries, first, last):
+    st.write(f"## {name} Count by Year for a Specific Country")
 
     selected_country = st.selectbox("Select a Country", countries, key='chart2')
 
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
+    show_chart(('country_count', indicator, selected_country, first, last),
+               lambda: country_count_chart(cube, indicator, name, color, selected_country, first, last))
 
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Storm_Count')
 
-    chart2 = alt.Chart(melted_data).mark_bar(color='purple').encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Storm_Count:Q', title='Storm Count'),
-        tooltip=['Year', 'Storm_Count']
-    ).properties(
-        width=600,
-        height=500,
-        title=f"Country selected - {selected_country}"
-    )
+# This code enables interactive exploration of drought data, such as the frequency and number of droughts by country and year. Users can explore various charts including a choropleth map, a bubble chart, and a pie chart by selecting countries from a dropdown menu in addition to viewing a bar chart showing frequency through time. These visualizations offer a simple means to understand patterns and trends in drought data.
 
-    st.altair_chart(chart2)
+def page_second():
+    disaster_page('Drought')
 
-    ###############################################################
 
-    storm_data = df[df['Indicator'] == 'Storm'].groupby(['Country']).sum().reset_index()
+# This code provides several interactive visualizations for examining data on extreme temperatures, such as the frequency and count of extreme temperatures by country and year. Users can select a country from a dropdown menu to view a bar chart that shows frequency over time. They can also explore other charts, such as a pie chart, a choropleth map, and bubble charts. These illustrations make it simple to comprehend the patterns and trends in the data on extreme temperatures.
 
-    chart = alt.Chart(storm_data).mark_circle().encode(
-        x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Storms'),
-        color=alt.Color('Country:N', legend=None),
-        size=alt.Size('Total:Q', legend=None),
-        tooltip=['Country', 'Total']
-    ).properties(
-        width=700,
-        height=500
-    ).interactive()
+def page_third():
+    disaster_page('Extreme temperature')
 
-    st.write(f"### Proportion of Total Number of Storms by Country")
 
-    st.altair_chart(chart)
+# The "page_fourth" function in this application loads and shows flood statistics broken down by country. Interactive visualizations, such as bar charts and choropleth maps, created using Plotly and Altair, such as the frequency and number of floods in various countries. A pie chart that shows the percentage contribution of each year to the total frequency of the flood indicator occurrences is another element of the function.
 
-    ###############################################################
+def page_fourth():
+    disaster_page('Flood')
 
-    data = pd.read_csv('./data/Storm.csv')
 
-    total_occurrences = data["Total"].sum()
+# The fifth page of this website application examines natural disasters. A choropleth map is used to display how frequently landslides occur in different countries and years, and the computer analyzes data on landslides to produce these maps. It also shows the total number of landslides by nation and the proportion that each year adds to the overall total using pie charts.
 
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
+def page_fifth():
+    disaster_page('Landslide')
 
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
 
-    st.write(f"### Contribution of Each Year's Storm Occurrences to the Total Number of Storms")
+# The page_sixth function pulls data on storm frequency by country from a CSV file and displays it in several charts. Users may browse statistics on storm frequency and count by year while choosing one or more nations. Along with a choropleth map showing the locations of the storms, the function also includes a chart showing the percentage of total storms per country.
 
-    fig = px.pie(df, values="Percentage", names="Year")
+def page_sixth():
+    disaster_page('Storm')
 
-    st.plotly_chart(fig)
-    
 
 # The application loads a dataset on wildfire occurrences and shows graphs illustrating their frequency and geographic distribution. The code also displays the proportion of all wildfires by country and the percentage contribution of each year to the overall number of occurrences. Users can select a country and view the wildfire counts by year. The code is repeated for each type of natural disaster (flood, landslide, and storm), each of which includes a different set of visuals.
 
-    
 def page_seventh():
-    
-
-    df = pd.read_csv("./data/Wildfire.csv")
-
-    countries = df['Country'].unique()
-
-    st.write("# Wildfire Frequency by Country")
-
-    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
-
-    country_data = df[df['Country'].isin(selected_countries)].drop(['Total','ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country', 'Indicator'], var_name='Year', value_name='Wildfire Frequency')
-
-    chart = alt.Chart(melted_data[melted_data['Indicator'] == 'Wildfire']).mark_bar().encode(
-        x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
-        y=alt.Y('Wildfire Frequency:Q', title='Wildfire Frequency'),
-        color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
-    ).properties(
-        width=800,
-        height=500,
-        title="Wildfire Frequency by Country"
-    )
-
-    st.altair_chart(chart)
-
-    ###############################################################
-
-    st.write(f"### Geographical Distribution of Wildfire Occurrences Among Various Countries")
-    fig = px.choropleth(data_frame=df,
-                    locations='Country',
-                    locationmode='country names',
-                    color='Total',
-                    scope='world')
-
-    st.plotly_chart(fig)
-
-    ###############################################################
-
-    st.write(f"## Wildfire Count by Year for a Specific Country")
-
-    selected_country = st.selectbox("Select a Country", countries, key='chart2')
-
-    country_data = df[df['Country'] == selected_country].drop(['Total', 'Indicator', 'ObjectId'], axis=1)
-
-    melted_data = pd.melt(country_data, id_vars=['Country'], var_name='Year', value_name='Wildfire_Count')
-
-    chart2 = alt.Chart(melted_data).mark_bar(color='orange').encode(
-        x=alt.X('Year:N', title='Year'),
-        y=alt.Y('Wildfire_Count:Q', title='Wildfire Count'),
-        tooltip=['Year', 'Wildfire_Count']
-    ).properties(
-        width=600,
-        height=500,
-        title=f"Country selected - {selected_country}"
-    )
-
-    st.altair_chart(chart2)
-
-    ###############################################################
-
-    wildfire_data = df[df['Indicator'] == 'Wildfire'].groupby(['Country']).sum().reset_index()
-
-    chart = alt.Chart(wildfire_data).mark_circle().encode(
-        x=alt.X('Country:N', sort='-y'),
-        y=alt.Y('Total:Q', title='Total Number of Wildfires'),
-        color=alt.Color('Country:N', legend=None),
-        size=alt.Size('Total:Q', legend=None),
-        tooltip=['Country', 'Total']
-    ).properties(
-        width=700,
-        height=500
-    ).interactive()
-
-    st.write(f"### Proportion of Total Number of Wildfires by Country")
-
-    st.altair_chart(chart)
-
-    ###############################################################
-
-    data = pd.read_csv('./data/Wildfire.csv')
-
-    total_occurrences = data["Total"].sum()
-
-    year_columns = [str(year) for year in range(2001, 2022)]
-    percentages = [data[year].sum() / total_occurrences * 100 for year in year_columns]
-
-    df = pd.DataFrame({"Year": year_columns, "Percentage": percentages})
-
-    st.write(f"### Contribution of Each Year's Wildfire Occurrences to the Total Number of Wildfires")
-
-    fig = px.pie(df, values="Percentage", names="Year")
-
-    st.plotly_chart(fig)
+    disaster_page('Wildfire')
 
     
 def main():
@@ -780,7 +648,49 @@ def main():
     }
     
     page = st.sidebar.selectbox("Main Menu", tuple(pages.keys()))
-    pages[page]()
+    with startup.measure('first page render'), metrics.page(page):
+        pages[page]()
+    metrics.flush()
+
+    # Preload the dependencies of the other pages now that this one has been drawn.
+    if os.environ.get('DISASTER_HUB_WARM_UP', '1') != '0':
+        startup.warm_up()
+    prewarm_charts()
+
+    stats = loader.cache_stats()
+    st.sidebar.caption(f"Data cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} datasets loaded")
+    stats = loader.memory_stats()
+    st.sidebar.caption(f"Data memory: {stats['bytes'] // 1024} KB in compact dtypes, {stats['saved_bytes'] // 1024} KB saved")
+    stats = chart_cache.chart_cache.stats()
+    st.sidebar.caption(f"Chart cache: {stats['hits']} hits, {stats['misses']} misses, {stats['bytes'] // 1024} KB")
+    with st.sidebar.expander("Startup time"):
+        for name, seconds in startup.report().items():
+            st.write(f"{name}: {seconds * 1000:.0f} ms")
+    if debug_enabled():
+        debug_panel(page)
+
+
+# Section timings of the current page, shown when DISASTER_HUB_DEBUG=1 or the URL has ?debug=1. The percentiles cover the last runs of this process across all sessions.
+
+def debug_enabled():
+    return os.environ.get('DISASTER_HUB_DEBUG') == '1' or st.query_params.get('debug') == '1'
+
+
+def debug_panel(page):
+    rows = metrics.summary(page)
+    with st.sidebar.expander("Section timings", expanded=True):
+        if not rows:
+            st.write("No timings recorded yet.")
+            return
+        st.dataframe(pd.DataFrame({
+            'Section': [row['section'] for row in rows],
+            'Phase': [row['phase'] for row in rows],
+            'Runs': [row['count'] for row in rows],
+            'Last ms': [row['last'] * 1000 for row in rows],
+            'p50 ms': [row['p50'] * 1000 for row in rows],
+            'p95 ms': [row['p95'] * 1000 for row in rows],
+        }).round(1), hide_index=True)
+
 
 if __name__ == "__main__":
     main()
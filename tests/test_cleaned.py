@@ -0,0 +1,119 @@
+# Incremental rebuilds of the cleaned tables (disaster_hub.cleaned) on an edited copy of
+# data/Original.csv: the summary of each run, and outputs byte-identical to a full rebuild
+# of the same source.
+
+import csv
+import io
+import os
+import shutil
+
+import pytest
+
+from disaster_hub import cleaned, loader
+
+
+def read_source(path):
+    header, lines = cleaned.read_lines(path)
+    return header, list(lines)
+
+
+def write_source(path, header, lines):
+    with open(path, 'wb') as handle:
+        handle.write(b'\n'.join([header] + lines) + b'\n')
+
+
+def fields(line):
+    return next(csv.reader([line.decode('utf-8')]))
+
+
+def line_of(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow(values)
+    return buffer.getvalue().encode('utf-8')
+
+
+def outputs(directory):
+    return {name: open(os.path.join(directory, name), 'rb').read()
+            for name in sorted(os.listdir(directory)) if name.endswith('.csv') and name != 'source.csv'}
+
+
+def assert_matches_full_rebuild(source, target_dir, tmp_path):
+    full_dir = tmp_path / 'full'
+    full_dir.mkdir(exist_ok=True)
+    cleaned.update(source, str(full_dir), full=True)
+    assert outputs(target_dir) == outputs(full_dir)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """An up-to-date cleaned build of a copy of Original.csv: (source, target_dir)."""
+    target_dir = tmp_path / 'cleaned'
+    target_dir.mkdir()
+    source = str(target_dir / 'source.csv')
+    shutil.copyfile(loader.data_path('Original.csv'), source)
+    cleaned.update(source, str(target_dir))
+    return source, str(target_dir)
+
+
+def test_full_rebuild_matches_committed_tables(workspace):
+    _, target_dir = workspace
+    for name, content in outputs(target_dir).items():
+        assert content == open(loader.data_path(name), 'rb').read(), name
+
+
+def test_unchanged_source_is_reused(workspace):
+    source, target_dir = workspace
+    summary = cleaned.update(source, target_dir)
+    assert (summary['parsed'], summary['removed'], summary['written']) == (0, 0, [])
+    assert summary['reused'] == summary['rows']
+
+
+def test_added_revised_and_removed_rows(workspace, tmp_path):
+    source, target_dir = workspace
+    header, lines = read_source(source)
+    revised = fields(lines[5])
+    revised[-1] = str(int(revised[-1] or 0) + 3)
+    added = fields(lines[0])
+    added[0], added[1] = '99999', 'Testland'
+    lines[5] = line_of(revised)
+    del lines[10]
+    lines.append(line_of(added))
+    write_source(source, header, lines)
+
+    summary = cleaned.update(source, target_dir)
+    assert (summary['parsed'], summary['added'], summary['revised'], summary['removed']) == (2, 1, 1, 1)
+    assert summary['reused'] == len(lines) - 2
+    assert 'Main.csv' in summary['written']
+    assert_matches_full_rebuild(source, target_dir, tmp_path)
+
+
+def test_reordered_rows_are_reused(workspace, tmp_path):
+    source, target_dir = workspace
+    header, lines = read_source(source)
+    write_source(source, header, lines[::-1])
+
+    summary = cleaned.update(source, target_dir)
+    assert (summary['parsed'], summary['removed']) == (0, 0)
+    assert 'Main.csv' in summary['written']
+    assert_matches_full_rebuild(source, target_dir, tmp_path)
+
+
+def test_new_year_column_revises_every_row(workspace, tmp_path):
+    source, target_dir = workspace
+    header, lines = read_source(source)
+    write_source(source, header + b',F2022', [line + b',1' for line in lines])
+
+    summary = cleaned.update(source, target_dir)
+    assert (summary['parsed'], summary['added'], summary['revised'], summary['removed']) == \
+        (len(lines), 0, len(lines), 0)
+    assert b',2022,' in outputs(target_dir)['Main.csv'].split(b'\n', 1)[0]
+    assert_matches_full_rebuild(source, target_dir, tmp_path)
+
+
+def test_deleted_output_is_written_again(workspace, tmp_path):
+    source, target_dir = workspace
+    os.remove(os.path.join(target_dir, 'Flood.csv'))
+
+    summary = cleaned.update(source, target_dir)
+    assert (summary['parsed'], summary['written']) == (0, ['Flood.csv'])
+    assert_matches_full_rebuild(source, target_dir, tmp_path)